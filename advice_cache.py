@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from cache_files import write_json_atomic
+
+logger = logging.getLogger("AdviceCache")
+
+ADVICE_CACHE_PATH = os.getenv("ADVICE_CACHE_PATH", os.path.join("ai_cache", "advice_cache.json"))
+ADVICE_CACHE_TTL = int(os.getenv("ADVICE_CACHE_TTL", str(24 * 3600)))  # seconds
+
+
+def fingerprint(summary, namespace=""):
+    """Stable key for one advice request: the model namespace plus the exact summary text."""
+    return hashlib.sha256(f"{namespace}\n{summary}".encode("utf-8")).hexdigest()
+
+
+class AdviceCache:
+    """
+    On-disk AI advice cache with TTL.
+    Keyed by the fingerprint of the summary built for each symbol, so identical
+    inputs (symbol, rounded dist_A, growth, margin, ROE, PE) never pay for a second call.
+    """
+    def __init__(self, path=ADVICE_CACHE_PATH, ttl=ADVICE_CACHE_TTL, namespace=""):
+        self.path = path
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            self._prune()
+        except Exception as e:
+            logger.warning(f"Advice cache unreadable, starting empty: {e}")
+            self._entries = {}
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        self._entries = {k: v for k, v in self._entries.items() if v.get("ts", 0) >= cutoff}
+
+    def get(self, summary):
+        key = fingerprint(summary, self.namespace)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry["ts"] < self.ttl:
+                self.hits += 1
+                return entry["advice"]
+            self.misses += 1
+            return None
+
+    def put(self, symbol, summary, advice):
+        key = fingerprint(summary, self.namespace)
+        with self._lock:
+            self._entries[key] = {"symbol": symbol, "advice": advice, "ts": time.time()}
+
+    def save(self):
+        """Persist to disk (atomic replace). Call once per scan, not per entry."""
+        if not self.path:
+            return
+        with self._lock:
+            self._prune()
+            snapshot = dict(self._entries)
+        try:
+            write_json_atomic(self.path, snapshot)
+        except Exception as e:
+            logger.error(f"Advice cache save failed: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,310 @@
+import os
+import time
+import random
+import json
+import asyncio
+import logging
+import threading
+
+from google.api_core import exceptions
+
+import tracing
+from metrics import GEMINI_LATENCY
+
+logger = logging.getLogger("AIClient")
+
+# --- Quota Settings (override via env to match the model's tier) ---
+# gemini-2.5-flash free tier allows 10 requests/minute.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "10"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "1"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+# Send all candidates in one prompt instead of one call per symbol
+AI_BATCH_MODE = os.getenv("AI_BATCH_MODE", "1") == "1"
+
+RATING_LABELS = ("強烈推薦", "穩健", "觀察")
+# Replies that mean "no advice" - never cached
+FAILURE_PREFIXES = ("AI 錯誤", "AI 分析暫時無法使用", "無回傳文字")
+
+
+def build_summary(symbol, info, dist_A):
+    """Data block sent to the model for one symbol."""
+    return (
+        f"股票代碼: {symbol}\n"
+        f"技術位階: 離支撐 A 點目前 {dist_A:+.1%}\n"
+        f"營收成長率: {(info.get('revenueGrowth') or 0)*100:.1f}%\n"
+        f"毛利率: {(info.get('grossMargins') or 0)*100:.1f}%\n"
+        f"ROE: {(info.get('returnOnEquity') or 0)*100:.1f}%\n"
+        f"本益比: {info.get('trailingPE', 'N/A')}\n"
+    )
+
+
+def build_prompt(summary):
+    return f"你是一位精通台股的專業分析師，請針對數據給予該標的 50 字內建議，開頭標註評等（強烈推薦/穩健/觀察）：\n{summary}"
+
+
+def build_batch_prompt(entries):
+    """entries: list of (symbol, summary). Asks for a JSON array with one object per symbol."""
+    blocks = "\n".join(f"[{i+1}]\n{summary}" for i, (_, summary) in enumerate(entries))
+    return (
+        "你是一位精通台股的專業分析師，以下是多檔標的數據，請逐一給予 50 字內建議。\n"
+        "只回傳 JSON 陣列，不要加任何其他文字，每個元素格式為：\n"
+        '{"symbol": "股票代碼", "rating": "強烈推薦|穩健|觀察", "advice": "建議內容"}\n'
+        f"{blocks}"
+    )
+
+
+def symbol_key(symbol):
+    """Loose symbol identity for matching model replies: '2330.tw' and '2330' both -> '2330'."""
+    symbol = str(symbol).strip().upper()
+    if symbol.endswith((".TW", ".TWO")):
+        symbol = symbol.rsplit(".", 1)[0]
+    return symbol
+
+
+def parse_batch_response(text, symbols):
+    """
+    Parse the model's JSON array into {symbol: advice}, keyed by the requested symbols.
+    Reply symbols are matched loosely (case, .TW/.TWO suffix), since models rarely echo them exactly.
+    Entries that are missing or malformed are simply left out so callers can retry them.
+    """
+    if not text:
+        return {}
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        rows = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+
+    wanted = {}
+    for symbol in symbols:
+        wanted.setdefault(symbol_key(symbol), symbol)
+    parsed = {}
+    for row in rows if isinstance(rows, list) else []:
+        if not isinstance(row, dict):
+            continue
+        symbol = wanted.get(symbol_key(row.get("symbol", "")))
+        rating = str(row.get("rating", "")).strip()
+        advice = str(row.get("advice", "")).strip()
+        if symbol is None or rating not in RATING_LABELS or not advice:
+            continue
+        # Keep the per-symbol format: advice starts with its rating
+        parsed[symbol] = advice if advice.startswith(rating) else f"{rating}：{advice}"
+    return parsed
+
+
+def parse_rating(advice):
+    """Map free-text advice to one of RATING_LABELS (defaults to 觀察)."""
+    for label in RATING_LABELS:
+        if label in advice:
+            return label
+    return "觀察"
+
+
+def is_failure(advice):
+    return not advice or advice.startswith(FAILURE_PREFIXES)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket (GCRA form).
+    Callers reserve the next free slot under a lock and then sleep until it is due,
+    so the bucket is shared safely across threads and event loops.
+    """
+    def __init__(self, rate_per_min, burst=1):
+        self.interval = 60.0 / rate_per_min
+        self.burst = max(1, burst)
+        self._tat = time.monotonic()  # theoretical arrival time of the next request
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._tat, now)
+            wait = max(0.0, start - now - self.interval * (self.burst - 1))
+            self._tat = start + self.interval
+            return wait
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# Shared by every Gemini client so concurrent jobs still respect one quota
+gemini_bucket = TokenBucket(GEMINI_RPM, GEMINI_BURST)
+
+
+class LoopThread:
+    """
+    One long-lived event loop on a daemon thread that every AI coroutine runs on.
+    The Gemini SDK keeps a process-wide async client whose grpc.aio channel is bound to the
+    loop it was first used on, so a fresh asyncio.run() per scan would leave later scans on a
+    closed loop (and concurrent scans sharing one channel across loops).
+    """
+    def __init__(self, name="ai-loop"):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run `coro` on the loop from a worker thread and wait for its result.
+        The caller's contextvars (e.g. the active trace) are copied into the task."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+
+ai_loop = LoopThread()
+
+
+class AsyncAdvisorClient:
+    """
+    Async wrapper around a generative model.
+    Runs up to `concurrency` requests in flight, paced by a token bucket (the model's own
+    `bucket` unless one is passed; None means unpaced), with jittered exponential backoff
+    on ResourceExhausted.
+    """
+    def __init__(self, model, bucket=None, concurrency=GEMINI_CONCURRENCY, cache=None,
+                 max_retries=3, backoff_base=5.0, backoff_cap=60.0):
+        self.model = model
+        self.cache = cache
+        self.bucket = bucket if bucket is not None else getattr(model, "bucket", None)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def _backoff_delay(self, attempt):
+        # "Equal jitter": half fixed, half random, so retries spread out but never hammer
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _generate(self, prompt, label, sem, **kwargs):
+        retries = 0
+        while retries < self.max_retries:
+            async with sem:
+                if self.bucket is not None:
+                    with tracing.span("rate_limit_wait", cat="ai", label=label):
+                        await self.bucket.acquire()
+                t0 = time.perf_counter()
+                with tracing.span("gemini", cat="ai", label=label, attempt=retries + 1) as sp:
+                    try:
+                        response = await self.model.generate_content_async(prompt, **kwargs)
+                        sp["outcome"] = "ok"
+                        GEMINI_LATENCY.observe(time.perf_counter() - t0, outcome="ok")
+                        return response.text.strip() if response and hasattr(response, 'text') else "無回傳文字"
+                    except exceptions.ResourceExhausted:
+                        sp["outcome"] = "rate_limited"
+                        GEMINI_LATENCY.observe(time.perf_counter() - t0, outcome="rate_limited")
+                        retries += 1
+                    except Exception as e:
+                        sp["outcome"] = "error"
+                        GEMINI_LATENCY.observe(time.perf_counter() - t0, outcome="error")
+                        logger.error(f"AI Error for {label}: {e}")
+                        return f"AI 錯誤: {str(e)}"
+            if retries >= self.max_retries:
+                break
+            # Back off outside the semaphore so other symbols can proceed
+            delay = self._backoff_delay(retries - 1)
+            logger.warning(f"⚠️ {label} 限流，等待 {delay:.1f} 秒... (重試 {retries}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+        return "AI 分析暫時無法使用 (限流/額度已滿)"
+
+    async def _advise_summary(self, symbol, summary, sem):
+        advice = await self._generate(build_prompt(summary), symbol, sem)
+        self._remember(symbol, summary, advice)
+        return advice
+
+    def _remember(self, symbol, summary, advice):
+        if self.cache is not None and not is_failure(advice):
+            self.cache.put(symbol, summary, advice)
+
+    def _cached(self, summary):
+        return self.cache.get(summary) if self.cache is not None else None
+
+    async def _advise(self, symbol, info, dist_A, sem):
+        """(advice, served_from_cache)"""
+        summary = build_summary(symbol, info, dist_A)
+        cached = self._cached(summary)
+        if cached is not None:
+            return cached, True
+        return await self._advise_summary(symbol, summary, sem), False
+
+    async def advise(self, symbol, info, dist_A, sem=None):
+        advice, _ = await self._advise(symbol, info, dist_A, sem or asyncio.Semaphore(self.concurrency))
+        return advice
+
+    async def advise_many(self, items, on_result=None):
+        """
+        items: list of (symbol, info, dist_A).
+        Returns (advice strings in the same order, number served from the cache by this call).
+        `on_result(symbol, advice)` fires as each completes.
+        """
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def run(symbol, info, dist_A):
+            advice, hit = await self._advise(symbol, info, dist_A, sem)
+            if on_result:
+                on_result(symbol, advice)
+            return advice, hit
+
+        outcomes = await asyncio.gather(*(run(*item) for item in items))
+        return [advice for advice, _ in outcomes], sum(hit for _, hit in outcomes)
+
+    async def advise_batch(self, items, on_result=None):
+        """
+        Same contract as advise_many, but diagnoses every item in a single prompt.
+        Only entries missing from (or malformed in) the JSON reply fall back to per-symbol calls.
+        """
+        if not items:
+            return [], 0
+        sem = asyncio.Semaphore(self.concurrency)
+        symbols = [symbol for symbol, _, _ in items]
+        summaries = {symbol: build_summary(symbol, info, dist_A) for symbol, info, dist_A in items}
+
+        parsed = {}
+        for symbol in symbols:
+            cached = self._cached(summaries[symbol])
+            if cached is not None:
+                parsed[symbol] = cached
+                if on_result:
+                    on_result(symbol, cached)
+
+        hits = len(parsed)
+        pending = [symbol for symbol in symbols if symbol not in parsed]
+        if pending:
+            entries = [(symbol, summaries[symbol]) for symbol in pending]
+            text = await self._generate(build_batch_prompt(entries), f"batch({len(pending)})", sem,
+                                        generation_config={"response_mime_type": "application/json"})
+            fresh = parse_batch_response(text, pending)
+            for symbol, advice in fresh.items():
+                self._remember(symbol, summaries[symbol], advice)
+                if on_result:
+                    on_result(symbol, advice)
+            parsed.update(fresh)
+
+        missing = [symbol for symbol in pending if symbol not in parsed]
+        if missing:
+            logger.warning(f"Batch reply missing {len(missing)}/{len(pending)} symbols, falling back to per-symbol calls")
+
+            async def run(symbol):
+                advice = await self._advise_summary(symbol, summaries[symbol], sem)
+                if on_result:
+                    on_result(symbol, advice)
+                return advice
+
+            fallback = await asyncio.gather(*(run(symbol) for symbol in missing))
+            parsed.update(zip(missing, fallback))
+
+        return [parsed[symbol] for symbol in symbols], hits
+
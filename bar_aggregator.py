@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, time as dtime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger("BarAggregator")
+
+BAR_INTERVALS = (1, 5, 60)                                          # minutes
+BAR_HISTORY = int(os.getenv("CAPITAL_BAR_HISTORY", "2000"))        # closed bars kept per symbol/interval
+# Capital sends integer prices scaled by 10^nDecimal; TAIFEX index futures use 2 decimals
+PRICE_SCALE = float(os.getenv("CAPITAL_PRICE_SCALE", "100"))
+# Pause after each batch so ticks are taken in batches instead of waking this thread (and
+# contending with the DLL callback for the GIL) on every tick. Bars are a minute wide at best.
+BAR_POLL_INTERVAL = float(os.getenv("CAPITAL_BAR_POLL_INTERVAL", "0.05"))
+
+# TAIFEX sessions (Taipei time). The night session runs past midnight into the next calendar day.
+DAY_OPEN, DAY_CLOSE = dtime(8, 45), dtime(13, 45)
+NIGHT_OPEN, NIGHT_CLOSE = dtime(15, 0), dtime(5, 0)
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def session_bounds(ts):
+    """(session_start, session_end) containing `ts`, or None between sessions."""
+    day = ts.date()
+    t = ts.time()
+    if DAY_OPEN <= t <= DAY_CLOSE:
+        return datetime.combine(day, DAY_OPEN), datetime.combine(day, DAY_CLOSE)
+    if t >= NIGHT_OPEN:
+        return datetime.combine(day, NIGHT_OPEN), datetime.combine(day + timedelta(days=1), NIGHT_CLOSE)
+    if t <= NIGHT_CLOSE:
+        return datetime.combine(day - timedelta(days=1), NIGHT_OPEN), datetime.combine(day, NIGHT_CLOSE)
+    return None
+
+
+def bar_start(ts, minutes):
+    """
+    Start of the `minutes` bar holding `ts`. Bars are anchored at the session open, so 60m bars
+    run 08:45-09:45 ... 12:45-13:45 and 15:00-16:00 ...; the closing tick at exactly 13:45:00
+    or 05:00:00 joins the last bar instead of opening a one-tick bar after the close.
+    Returns (start, end) or None outside the sessions.
+    """
+    bounds = session_bounds(ts)
+    if bounds is None:
+        return None
+    start, end = bounds
+    ts = min(ts, end - timedelta(microseconds=1))
+    step = timedelta(minutes=minutes)
+    bucket = start + ((ts - start) // step) * step
+    return bucket, min(bucket + step, end)
+
+
+def tick_datetime(date, time_hms):
+    """Capital's YYYYMMDD + HHMMSS integers -> naive Taipei datetime."""
+    return datetime(date // 10000, date // 100 % 100, date % 100,
+                    time_hms // 10000, time_hms // 100 % 100, time_hms % 100)
+
+
+class BarAggregator:
+    """
+    Streaming OHLCV bars (1m/5m/60m by default) per symbol, built from a TickBus subscription
+    on its own thread so bar building never runs on the DLL callback thread.
+    Simulated (pre-open matching) ticks and ticks between sessions are skipped.
+    `bars()` returns a DataFrame shaped like yfinance output for analyze_stock_technical.
+    """
+    def __init__(self, bus=None, intervals=BAR_INTERVALS, price_scale=PRICE_SCALE, history=BAR_HISTORY):
+        self.bus = bus
+        self.intervals = tuple(intervals)
+        self.price_scale = price_scale
+        self.history = history
+        self.ticks = 0
+        self.skipped = 0
+        self._closed = {}    # (symbol, minutes) -> deque of (start, o, h, l, c, v)
+        self._current = {}   # (symbol, minutes) -> [start, end, o, h, l, c, v]
+        self._session_open = {}   # symbol -> (session start, first price)
+        self._last_ts = None      # market clock: timestamp of the newest tick...
+        self._last_mono = None    # ...and when it arrived, so idle time can advance the clock
+        self._lock = threading.Lock()
+        self._sub = None
+        self._thread = None
+
+    # --- Feed ---
+    def start(self):
+        if self.bus is None or self._thread is not None:
+            return
+        self._sub = self.bus.subscribe(name="bars")
+        self._thread = threading.Thread(target=self._run, name="bar-aggregator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._sub is not None:
+            self._sub.close()
+
+    def _run(self):
+        while not self._sub.closed:
+            rows = self._sub.poll(timeout=1.0)
+            with self._lock:
+                for row in rows:
+                    if row["simulate"]:
+                        self.skipped += 1
+                        continue
+                    self._add(row["symbol"].decode("ascii", "replace"), int(row["date"]), int(row["time"]),
+                              float(row["price"]), int(row["qty"]))
+                now = self.market_now()
+                if now is not None:
+                    self._roll(now)
+            if len(rows) and BAR_POLL_INTERVAL > 0:
+                time.sleep(BAR_POLL_INTERVAL)
+
+    def market_now(self):
+        """Tick time plus the idle time since it arrived (the wall clock would close replayed bars early)."""
+        if self._last_ts is None:
+            return None
+        return self._last_ts + timedelta(seconds=time.monotonic() - self._last_mono)
+
+    def on_tick(self, symbol, date, time_hms, price, qty):
+        """Feed one tick directly (replay, tests). `price` is the raw scaled Capital price."""
+        with self._lock:
+            self._add(symbol, date, time_hms, price, qty)
+
+    def _add(self, symbol, date, time_hms, price, qty):
+        """Caller holds the lock."""
+        ts = tick_datetime(date, time_hms)
+        session = session_bounds(ts)
+        if session is None:
+            self.skipped += 1
+            return
+        price = price / self.price_scale
+        self.ticks += 1
+        opened = self._session_open.get(symbol)
+        if opened is None or opened[0] < session[0]:
+            self._session_open[symbol] = (session[0], price)
+        if self._last_ts is None or ts >= self._last_ts:
+            self._last_ts = ts
+            self._last_mono = time.monotonic()
+        for minutes in self.intervals:
+            bounds = bar_start(ts, minutes)
+            key = (symbol, minutes)
+            bar = self._current.get(key)
+            if bar is None:
+                closed = self._closed.get(key)
+                if closed and closed[-1][0] >= bounds[0]:
+                    continue  # late tick for an already closed bar
+            if bar is not None and bar[0] == bounds[0]:
+                bar[3] = max(bar[3], price)
+                bar[4] = min(bar[4], price)
+                bar[5] = price
+                bar[6] += qty
+                continue
+            if bar is not None:
+                if bounds[0] < bar[0]:
+                    continue  # late tick for an already closed bar
+                self._close(key, bar)
+            self._current[key] = [bounds[0], bounds[1], price, price, price, price, qty]
+
+    def _close(self, key, bar):
+        closed = self._closed.get(key)
+        if closed is None:
+            closed = self._closed[key] = deque(maxlen=self.history)
+        closed.append((bar[0], bar[2], bar[3], bar[4], bar[5], bar[6]))
+
+    def _roll(self, now):
+        """Close bars whose end has passed (quiet markets, session close). Caller holds the lock."""
+        for key, bar in list(self._current.items()):
+            if bar[1] <= now:
+                self._close(key, bar)
+                del self._current[key]
+
+    def roll(self, now=None):
+        with self._lock:
+            now = now or self.market_now()
+            if now is not None:
+                self._roll(now)
+
+    # --- Readers ---
+    def bars(self, symbol, minutes, include_partial=True, limit=None):
+        """OHLCV DataFrame indexed by bar start (Taipei time), oldest first."""
+        key = (symbol, minutes)
+        with self._lock:
+            rows = list(self._closed.get(key, ()))
+            current = self._current.get(key)
+            if include_partial and current is not None:
+                rows.append((current[0], current[2], current[3], current[4], current[5], current[6]))
+        if limit:
+            rows = rows[-limit:]
+        if not rows:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name="Datetime"))
+        df = pd.DataFrame([r[1:] for r in rows], columns=BAR_COLUMNS,
+                          index=pd.DatetimeIndex([r[0] for r in rows], name="Datetime"))
+        return df.astype({"Open": float, "High": float, "Low": float, "Close": float, "Volume": "int64"})
+
+    def session_open(self, symbol):
+        """First traded price of the latest session seen for `symbol`, or None."""
+        opened = self._session_open.get(symbol)
+        return opened[1] if opened else None
+
+    def symbols(self):
+        with self._lock:
+            return sorted({symbol for symbol, _ in list(self._closed) + list(self._current)})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "skipped": self.skipped,
+                "series": {f"{s}/{m}m": len(self._closed.get((s, m), ())) for s, m in
+                           set(self._closed) | set(self._current)},
+            }
@@ -0,0 +1,88 @@
+import sys
+import time
+import statistics
+import tracemalloc
+from queue import Queue, Empty
+
+from capital_futures import CapitalFuturesClient
+from tick_replay import synthetic_ticks, replay
+
+# Usage: python bench_callback.py [seconds] [ticks_per_second]
+# Drives _on_notify_ticks at a steady rate with bytes symbols (as the DLL does) and reports
+# per-callback latency, then re-runs under tracemalloc for memory allocated per callback.
+# "per-tick dict" is the previous callback shape (decode + new dict + queue) for comparison.
+# The ring path runs with the client's bar aggregator consuming, so reader wake-ups count.
+SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+RATE = float(sys.argv[2]) if len(sys.argv) > 2 else 10000
+SYMBOLS = ("TX00", "MTX00", "TE00", "TF00")
+
+
+def dll_ticks(count):
+    for offset, args in synthetic_ticks(SYMBOLS, count, rate=RATE):
+        yield offset, (args[0], args[1].encode("ascii")) + args[2:]
+
+
+def dict_callback():
+    latest, queue = {}, Queue()
+
+    def on_tick(marketNo, strStockNo, ptr, date, timeHMS, timeMicro, bid, ask, close, qty, simulate):
+        symbol_str = strStockNo.decode('ascii') if isinstance(strStockNo, bytes) else strStockNo
+        tick = {"symbol": symbol_str, "date": date, "time": timeHMS, "bid": bid, "ask": ask,
+                "price": close, "qty": qty, "vol": qty, "simulate": simulate}
+        latest[symbol_str] = tick
+        queue.put(tick)
+        if queue.qsize() > 1000:  # stand-in consumer
+            try:
+                while True:
+                    queue.get_nowait()
+            except Empty:
+                pass
+    return on_tick
+
+
+def latency(callback, count, speed):
+    samples = []
+    perf = time.perf_counter
+
+    def timed(*args):
+        t0 = perf()
+        callback(*args)
+        samples.append(perf() - t0)
+
+    sent, elapsed = replay(dll_ticks(count), timed, speed)
+    samples.sort()
+    return sent / elapsed, samples
+
+
+def allocations(callback, count):
+    """Peak transient bytes per call and bytes still held after the run, per tick."""
+    ticks = list(dll_ticks(count))
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    transient = []
+    for _, args in ticks:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        callback(*args)
+        transient.append(tracemalloc.get_traced_memory()[1] - before)
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return statistics.mean(transient), retained / count
+
+
+def bench():
+    client = CapitalFuturesClient()
+    count = int(SECONDS * RATE)
+    print(f"🚀 Tick callback at {RATE:,.0f} ticks/s for {SECONDS:g}s ({count} ticks, {len(SYMBOLS)} symbols)")
+    for name, callback in (("per-tick dict", dict_callback()), ("ring + snapshot", client._on_notify_ticks)):
+        rate, samples = latency(callback, count, speed=1)
+        p = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1e6
+        transient, retained = allocations(callback, min(count, 50000))
+        print(f"  {name:<14} {rate:>8,.0f} ticks/s  p50={p(0.5):6.2f}us p99={p(0.99):7.2f}us "
+              f"max={samples[-1] * 1e6:8.1f}us  alloc/tick={transient:6.0f}B retained/tick={retained:6.1f}B")
+    print(f"  symbols interned: {len(client.symbols)}")
+    client.stop()
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,55 @@
+import sys
+import time
+import statistics
+
+from capital_futures import CapitalFuturesClient
+
+# Usage: python bench_capital.py [rounds]
+# Round-trip latency of login/subscribe through the worker thread (mock mode off Windows),
+# plus the worker's CPU use while idle.
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {name:<18} n={len(samples):<5} p50={statistics.median(samples)*1000:8.3f}ms "
+          f"p95={p95*1000:8.3f}ms max={samples[-1]*1000:8.3f}ms")
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def bench():
+    client = CapitalFuturesClient.get_instance()
+    print(f"🚀 Capital worker round trips ({'Windows' if client.is_windows else 'mock'} mode), {ROUNDS} rounds")
+    client.login("bench", "bench")  # warm up
+
+    logins = [timed(client.login, "bench", "bench") for _ in range(ROUNDS)]
+    subscribes = [timed(client.subscribe, "TX00") for _ in range(ROUNDS)]
+    summarize("login", logins)
+    summarize("subscribe", subscribes)
+
+    # 50-contract watchlist: one call per symbol vs one subscribe_many round trip
+    watchlist = [f"W{i:03d}" for i in range(50)]
+    one_by_one, batched = [], []
+    for _ in range(max(1, ROUNDS // 10)):
+        one_by_one.append(timed(lambda: [client.subscribe(s) for s in watchlist]))
+        client.unsubscribe(watchlist)
+        batched.append(timed(client.subscribe_many, watchlist))
+        client.unsubscribe(watchlist)
+    summarize("50 x subscribe", one_by_one)
+    summarize("subscribe_many(50)", batched)
+
+    idle_seconds = 3
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    time.sleep(idle_seconds)
+    cpu = time.process_time() - cpu0
+    print(f"  idle CPU   {cpu / (time.perf_counter() - wall0) * 100:.2f}% of one core over {idle_seconds}s")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,83 @@
+import time
+import argparse
+import threading
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Usage: python bench_load.py [base_url] [concurrency]
+BASE_URL = "http://localhost:8001"
+CONCURRENCY = 50
+SYMBOLS = ["2330", "2317", "2454", "2308", "2382", "2412", "2881", "2882", "1301", "1303"]
+
+
+def timed_get(path, timeout=120):
+    t0 = time.perf_counter()
+    try:
+        ok = requests.get(BASE_URL + path, timeout=timeout).status_code == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - t0, ok
+
+
+def probe(path, stop, samples, interval=0.5):
+    """Keep hitting a light endpoint while the heavy load runs."""
+    while not stop.is_set():
+        samples.append(timed_get(path, timeout=30))
+        time.sleep(interval)
+
+
+def summarize(name, samples):
+    latencies = sorted(dt for dt, _ in samples)
+    failures = sum(1 for _, ok in samples if not ok)
+    if not latencies:
+        print(f"  {name:<14} no samples")
+        return
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  {name:<14} n={len(latencies):<4} p50={statistics.median(latencies)*1000:8.1f}ms "
+          f"p95={p95*1000:8.1f}ms max={latencies[-1]*1000:8.1f}ms failures={failures}")
+
+
+def bench(concurrency=CONCURRENCY):
+    print(f"🚀 Load test against {BASE_URL}: {concurrency} concurrent check_stock requests")
+
+    # Baseline with the server idle
+    idle_health = [timed_get("/api/health") for _ in range(5)]
+    idle_quote = [timed_get("/api/quote?symbols=2330") for _ in range(2)]
+
+    stop = threading.Event()
+    health_samples, quote_samples = [], []
+    probes = [
+        threading.Thread(target=probe, args=("/api/health", stop, health_samples), daemon=True),
+        threading.Thread(target=probe, args=("/api/quote?symbols=^TWII,2330", stop, quote_samples, 1.0), daemon=True),
+    ]
+    for t in probes:
+        t.start()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        paths = [f"/api/check_stock?symbol={SYMBOLS[i % len(SYMBOLS)]}&lookback={100 + i}" for i in range(concurrency)]
+        check_samples = list(pool.map(timed_get, paths))
+    total = time.perf_counter() - t0
+
+    stop.set()
+    for t in probes:
+        t.join()
+
+    print(f"⏱️ {concurrency} check_stock calls finished in {total:.2f}s")
+    print("Idle:")
+    summarize("/api/health", idle_health)
+    summarize("/api/quote", idle_quote)
+    print(f"Under load ({concurrency}x check_stock):")
+    summarize("/api/check_stock", check_samples)
+    summarize("/api/health", health_samples)
+    summarize("/api/quote", quote_samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent check_stock load with health/quote latency probes")
+    parser.add_argument("base_url", nargs="?", default=BASE_URL)
+    parser.add_argument("concurrency", nargs="?", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+    BASE_URL = args.base_url.rstrip("/")
+    bench(args.concurrency)
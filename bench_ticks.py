@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from capital_futures import CapitalFuturesClient
+from tick_replay import synthetic_ticks, read_ticks
+
+# Usage: python bench_ticks.py [ticks] [recording]
+# Pushes synthetic (or recorded) ticks through _on_notify_ticks as fast as possible and
+# reports callback throughput plus how fast each downstream consumer keeps up.
+TICKS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+RECORDING = sys.argv[2] if len(sys.argv) > 2 else None
+# Ticks per second of market time: low enough that a run spans many 1m and several 5m bars
+SYNTHETIC_RATE = 100.0
+
+
+def drain(sub, counts, stop):
+    while not stop.is_set() or sub.bus.ring.next_seq > sub.cursor:
+        counts["ticks"] += len(sub.poll(timeout=0.2))
+    counts["done"] = time.perf_counter()
+
+
+def bench():
+    client = CapitalFuturesClient()
+    symbols = ("TX00", "MTX00", "TE00", "TF00")
+    source = read_ticks(RECORDING) if RECORDING else synthetic_ticks(symbols, TICKS, rate=SYNTHETIC_RATE)
+    print(f"🚀 Tick pipeline benchmark: {'recording ' + RECORDING if RECORDING else f'{TICKS} synthetic ticks'}")
+
+    stop = threading.Event()
+    consumers = {"all": (client.subscribe_ticks(name="all"), {"ticks": 0}),
+                 "TX00 only": (client.subscribe_ticks("TX00", name="tx"), {"ticks": 0})}
+    threads = [threading.Thread(target=drain, args=(sub, counts, stop), daemon=True) for sub, counts in consumers.values()]
+    for t in threads:
+        t.start()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_ticks.pytk")
+    recorder = client.record(path)
+
+    sent, elapsed = client.replay(source, speed=0, block=True)
+    stop.set()
+    for t in threads:
+        t.join()
+    t_end = time.perf_counter()
+    recorder.stop()
+    deadline = time.time() + 30
+    while client.bars.stats()["ticks"] + client.bars.skipped < sent and time.time() < deadline:
+        time.sleep(0.05)  # let the bar aggregator drain the ring
+
+    print(f"  callback        {sent} ticks in {elapsed:.2f}s = {sent / elapsed:,.0f} ticks/s")
+    for name, (sub, counts) in consumers.items():
+        print(f"  {name:<15} {counts['ticks']} ticks, missed {sub.missed}, "
+              f"lag at end of replay {counts['done'] - t_end:+.3f}s")
+    stats = client.tick_stats()
+    print(f"  recorder        {recorder.recorded} ticks, missed {recorder.stats()['missed']}, "
+          f"{os.path.getsize(path) / max(1, recorder.recorded):.1f} bytes/tick")
+    print(f"  bars            {stats['bars']['ticks']} ticks aggregated, series {stats['bars']['series']}")
+    print(f"  ring            overwritten {stats['ring']['overwritten']}")
+
+    replayed = sum(1 for _ in read_ticks(path))
+    print(f"  recording       {replayed} ticks readable from {path}")
+    client.stop()
+
+
+if __name__ == "__main__":
+    bench()
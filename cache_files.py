@@ -0,0 +1,27 @@
+import os
+import json
+import tempfile
+
+
+def write_json_atomic(path, data):
+    """
+    Write `data` as JSON to `path` via a uniquely named temp file in the same folder and
+    os.replace, so concurrent saves (e.g. two scans finishing together) never share a temp
+    file and readers only ever see a complete file.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=folder, prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False) as f:
+        tmp_path = f.name
+        try:
+            json.dump(data, f, ensure_ascii=False)
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -3,7 +3,6 @@ import os
 import asyncio
 import logging
 from queue import Queue, Empty
-from datetime import datetime
 import json
 import threading
 import ctypes
@@ -11,9 +10,15 @@ try:
     from ctypes import wintypes
 except ImportError:
     wintypes = None
-import time
 import concurrent.futures
 
+from tick_buffer import TickRing, SymbolTable
+from quote_snapshot import QuoteTable
+from tick_bus import TickBus
+from bar_aggregator import BarAggregator
+from log_writer import BatchedLogWriter
+from tick_replay import TickRecorder, read_ticks, replay
+
 # Ensure we can import SKDLLPython
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sk_path = os.path.join(current_dir, "SKDLLPythonTester")
@@ -28,22 +33,65 @@ except ImportError:
 
 logger = logging.getLogger("CapitalFutures")
 
+# Worker wake-up: commands and window messages wake the loop at once; this is only the
+# longest it sleeps before re-checking `running` when nothing happens.
+WORKER_IDLE_TIMEOUT = float(os.getenv("CAPITAL_WORKER_IDLE_TIMEOUT", "1.0"))
+PM_REMOVE = 0x0001
+QS_ALLINPUT = 0x04FF
+MWMO_INPUTAVAILABLE = 0x0004
+# RequestTicks takes a comma-separated symbol list per page; pages run 1..TICK_PAGES
+TICK_PAGE_SIZE = int(os.getenv("CAPITAL_TICK_PAGE_SIZE", "50"))
+TICK_PAGES = int(os.getenv("CAPITAL_TICK_PAGES", "50"))
+CAPITAL_LOG_PATH = os.getenv("CAPITAL_LOG_PATH", "capital_robust.log")
+# Mock mode only: replay a tick recording into the callbacks at startup (e.g. for Docker benchmarks)
+CAPITAL_REPLAY = os.getenv("CAPITAL_REPLAY", "")
+CAPITAL_REPLAY_SPEED = float(os.getenv("CAPITAL_REPLAY_SPEED", "1"))
 
-import concurrent.futures
+def _parse_symbols(symbols):
+    """'TX00, MTX00' or an iterable -> de-duplicated list in the given order."""
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    return list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
 
 class CapitalFuturesClient:
     _instance = None
     
     def __init__(self):
+        self.log = BatchedLogWriter(CAPITAL_LOG_PATH)
         self.is_connected = False
-        self.quote_queue = Queue()
-        self.latest_quotes = {}
+        self.last_login = None   # result of the most recent login attempt (no credentials)
+        self.ticks = TickRing()
+        self.bus = TickBus(self.ticks)
+        self.bars = BarAggregator(self.bus)
+        self.bars.start()
+        self.symbols = SymbolTable()
+        self.quotes = QuoteTable()   # latest quote per symbol; lock-free reads
+        # Tick subscriptions; only the worker thread mutates these
+        self._page_symbols = {}   # page -> [symbol, ...] in request order
+        self._symbol_page = {}    # symbol -> page
         self.cmd_queue = Queue()
         self.running = True
+        self.is_windows = (os.name == 'nt')
+        self._user32 = None
+        self._msg = None
+        self._kernel32 = None
+        self._wake_event = None
+        if self.is_windows:
+            try:
+                # Auto-reset event: _submit() sets it, MsgWaitForMultipleObjectsEx wakes on it
+                self._kernel32 = ctypes.windll.kernel32
+                self._kernel32.CreateEventW.restype = wintypes.HANDLE
+                self._kernel32.SetEvent.argtypes = [wintypes.HANDLE]
+                self._wake_event = self._kernel32.CreateEventW(None, False, False, None)
+            except Exception as e:
+                self.write_log(f"CreateEvent failed, falling back to timed waits: {e}")
         
         # Worker thread for API calls + Message Pump
         self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
         self.worker_thread.start()
+
+        if CAPITAL_REPLAY and not self.is_windows:
+            self.replay(CAPITAL_REPLAY, speed=CAPITAL_REPLAY_SPEED)
         
     @classmethod
     def get_instance(cls):
@@ -52,21 +100,13 @@ class CapitalFuturesClient:
         return cls._instance
 
     def write_log(self, msg):
-        try:
-            with open("capital_robust.log", "a", encoding="utf-8") as f:
-                f.write(f"{datetime.now()} {msg}\n")
-        except:
-            pass
+        # Non-blocking: the line is queued and written in batches by the log writer thread
+        self.log.write(msg)
 
     def _worker_loop(self):
         self.write_log("Starting Capital Worker Loop")
         
-        is_windows = (os.name == 'nt')
-        user32 = None
-        msg = None
-        PM_REMOVE = 0x0001
-        
-        if is_windows:
+        if self.is_windows:
             try:
                 import pythoncom
                 pythoncom.CoInitialize()
@@ -76,8 +116,8 @@ class CapitalFuturesClient:
 
             # Initialize User32 for pump
             try:
-                user32 = ctypes.windll.user32
-                msg = wintypes.MSG()
+                self._user32 = ctypes.windll.user32
+                self._msg = wintypes.MSG()
             except Exception as e:
                 self.write_log(f"Windows API init failed: {e}")
                 
@@ -97,55 +137,86 @@ class CapitalFuturesClient:
         self.write_log("Entering main loop")
         try:
             while self.running:
-                # 1. Process Queue
-                try:
-                    # Non-blocking get
-                    while not self.cmd_queue.empty():
-                        task = self.cmd_queue.get_nowait()
-                        action, args, future = task
-                        self.write_log(f"Processing task: {action}")
-                        try:
-                            # Handle actions
-                            res = None
-                            if action == 'login':
-                                if is_windows:
-                                    res = self._do_login(*args)
-                                else:
-                                    # Mock success for testing in Docker
-                                    res = {"status": "success", "message": "Login Simulated (Non-Windows)"}
-                            elif action == 'subscribe':
-                                if is_windows:
-                                    res = self._do_subscribe(*args)
-                                else:
-                                    res = {"status": "success", "message": f"Subscribe {args[0]} Simulated"}
-                            
-                            self.write_log(f"Task {action} completed: {res}")
-                            if future:
-                                future.set_result(res)
-                        except Exception as e:
-                            self.write_log(f"Task {action} failed execution: {e}")
-                            if future: future.set_exception(e)
-                except Exception as e:
-                    self.write_log(f"Queue/Task Error: {e}")
-
-                # 2. Windows Message Pump (PeekMessage)
-                if is_windows and user32 is not None:
-                    try:
-                        msg_count = 0
-                        while user32.PeekMessageW(ctypes.byref(msg), 0, 0, 0, PM_REMOVE) != 0:
-                            user32.TranslateMessage(ctypes.byref(msg))
-                            user32.DispatchMessageW(ctypes.byref(msg))
-                            msg_count += 1
-                            if msg_count > 100: break
-                    except Exception as e:
-                        self.write_log(f"Pump Error: {e}")
-                
-                time.sleep(0.01)
+                if self.is_windows and self._user32 is not None:
+                    if self._wake_event:
+                        # Sleep until a command is signalled or a window message (DLL callback) arrives
+                        self._wait_windows()
+                        self._drain_commands()
+                    else:
+                        # No event handle: short timed waits so the pump keeps running
+                        self._wait_command(0.01)
+                    self._pump_messages()
+                else:
+                    # Blocks until a command arrives; the timeout only re-checks self.running
+                    self._wait_command(WORKER_IDLE_TIMEOUT)
         except Exception as e:
             self.write_log(f"Worker Loop CRASHED: {e}")
             import traceback
             self.write_log(traceback.format_exc())
 
+    def _wait_windows(self):
+        handles = (wintypes.HANDLE * 1)(self._wake_event)
+        # MWMO_INPUTAVAILABLE: also return for messages left in the queue by a capped pump pass
+        self._user32.MsgWaitForMultipleObjectsEx(1, handles, int(WORKER_IDLE_TIMEOUT * 1000),
+                                                 QS_ALLINPUT, MWMO_INPUTAVAILABLE)
+
+    def _pump_messages(self):
+        try:
+            msg_count = 0
+            while self._user32.PeekMessageW(ctypes.byref(self._msg), 0, 0, 0, PM_REMOVE) != 0:
+                self._user32.TranslateMessage(ctypes.byref(self._msg))
+                self._user32.DispatchMessageW(ctypes.byref(self._msg))
+                msg_count += 1
+                if msg_count > 100: break
+        except Exception as e:
+            self.write_log(f"Pump Error: {e}")
+
+    def _wait_command(self, timeout):
+        try:
+            task = self.cmd_queue.get(timeout=timeout)
+        except Empty:
+            return
+        self._dispatch(task)
+        self._drain_commands()
+
+    def _drain_commands(self):
+        while True:
+            try:
+                task = self.cmd_queue.get_nowait()
+            except Empty:
+                return
+            self._dispatch(task)
+
+    def _dispatch(self, task):
+        if task is None:  # stop() sentinel
+            return
+        action, args, future = task
+        self.write_log(f"Processing task: {action}")
+        try:
+            # Handle actions
+            res = None
+            if action == 'login':
+                if self.is_windows:
+                    res = self._do_login(*args)
+                else:
+                    # Mock success for testing in Docker
+                    res = {"status": "success", "message": "Login Simulated (Non-Windows)"}
+                    self.is_connected = True
+                self.last_login = {**res, "user": args[0]}
+            elif action == 'subscribe':
+                res = self._do_subscribe(*args)
+            elif action == 'unsubscribe':
+                res = self._do_unsubscribe(*args)
+            
+            self.write_log(f"Task {action} completed: {res}")
+            if future:
+                future.set_result(res)
+        except Exception as e:
+            self.write_log(f"Task {action} failed execution: {e}")
+            if action == 'login':
+                self.last_login = {"status": "error", "message": str(e), "user": args[0]}
+            if future: future.set_exception(e)
+
     def _do_login(self, user_id, password, flag=0, cert="", path=""):
         if not SK: return {"status": "error", "message": "DLL missing"}
         self.write_log(f"Worker: Calling SK.Login for {user_id}...")
@@ -176,26 +247,116 @@ class CapitalFuturesClient:
             self.write_log(f"Worker: SK.Login exception: {e}")
             raise e
 
-    def _do_subscribe(self, symbol):
-        if not SK: return {"status": "error"}
-        self.write_log(f"Worker: Subscribe {symbol}")
-        # Use Page 1
-        res = SK.SKQuoteLib_RequestTicks(1, symbol)
-        self.write_log(f"Worker: RequestTicks Result: {res}")
-        if res == 0:
-            return {"status": "success", "message": f"Subscribed {symbol}"}
-        return {"status": "error", "message": f"Failed: {SK.GetMessage(res)}"}
+    def _do_subscribe(self, symbols):
+        """
+        Assign new symbols to pages with room (lowest first) and issue one RequestTicks per
+        touched page with that page's full list. Mock mode tracks pages without calling the DLL.
+        """
+        if self.is_windows and not SK: return {"status": "error", "message": "DLL missing"}
+        touched = {}
+        rejected = []
+        for symbol in symbols:
+            if symbol in self._symbol_page:
+                continue
+            page = next((p for p in range(1, TICK_PAGES + 1)
+                         if len(self._page_symbols.get(p, ())) < TICK_PAGE_SIZE), None)
+            if page is None:
+                rejected.append(symbol)
+                continue
+            self._page_symbols.setdefault(page, []).append(symbol)
+            self._symbol_page[symbol] = page
+            self.quotes.allocate(symbol)
+            touched.setdefault(page, []).append(symbol)
+
+        failed = {symbol: "No free page" for symbol in rejected}
+        for page, added in touched.items():
+            stock_nos = ",".join(self._page_symbols[page])
+            self.write_log(f"Worker: RequestTicks page {page}: {stock_nos}")
+            if not self.is_windows:
+                continue
+            res = SK.SKQuoteLib_RequestTicks(page, stock_nos)
+            self.write_log(f"Worker: RequestTicks page {page} result: {res}")
+            if res != 0:
+                message = SK.GetMessage(res)
+                for symbol in added:
+                    self._page_symbols[page].remove(symbol)
+                    del self._symbol_page[symbol]
+                    failed[symbol] = message
+                if not self._page_symbols[page]:
+                    del self._page_symbols[page]
+        return self._subscription_result("Subscribed", symbols, failed)
+
+    def _do_unsubscribe(self, symbols):
+        if self.is_windows and not SK: return {"status": "error", "message": "DLL missing"}
+        owned = [symbol for symbol in symbols if symbol in self._symbol_page]
+        failed = {}
+        if owned:
+            stock_nos = ",".join(owned)
+            self.write_log(f"Worker: CancelRequestTicks {stock_nos}")
+            res = SK.SKQuoteLib_CancelRequestTicks(stock_nos) if self.is_windows else 0
+            if res != 0:
+                failed = {symbol: SK.GetMessage(res) for symbol in owned}
+            else:
+                for symbol in owned:
+                    page = self._symbol_page.pop(symbol)
+                    self._page_symbols[page].remove(symbol)
+                    if not self._page_symbols[page]:
+                        del self._page_symbols[page]
+        return self._subscription_result("Unsubscribed", symbols, failed)
+
+    def _subscription_result(self, verb, symbols, failed):
+        done = [symbol for symbol in symbols if symbol not in failed]
+        status = "success" if not failed else ("partial" if done else "error")
+        message = f"{verb} {','.join(done)}" if done else f"Failed: {'; '.join(sorted(set(failed.values())))}"
+        if not self.is_windows:
+            message += " (Simulated)"
+        return {"status": status, "message": message, "symbols": done, "failed": failed,
+                "pages": {page: list(syms) for page, syms in self._page_symbols.items()}}
 
     # --- Public Methods ---
-    def login(self, user_id, password, flag=0, cert="", path=""):
+    def _submit(self, action, args, timeout):
+        """Queue a command for the worker thread and wake it immediately."""
         future = concurrent.futures.Future()
-        self.cmd_queue.put(('login', (user_id, password, flag, cert, path), future))
-        return future.result(timeout=10)
+        self.cmd_queue.put((action, args, future))
+        if self._wake_event:
+            self._kernel32.SetEvent(self._wake_event)
+        return future.result(timeout=timeout)
+
+    def login(self, user_id, password, flag=0, cert="", path=""):
+        return self._submit('login', (user_id, password, flag, cert, path), timeout=10)
 
     def subscribe(self, symbol):
-        future = concurrent.futures.Future()
-        self.cmd_queue.put(('subscribe', (symbol,), future))
-        return future.result(timeout=5)
+        return self.subscribe_many([symbol])
+
+    def subscribe_many(self, symbols):
+        """
+        Subscribe ticks for a watchlist ("TX00,MTX00" or a list) in one worker round trip:
+        symbols are packed into comma-separated lists of up to TICK_PAGE_SIZE per page.
+        Already subscribed symbols are kept on their page.
+        """
+        return self._submit('subscribe', (_parse_symbols(symbols),), timeout=5)
+
+    def unsubscribe(self, symbols):
+        return self._submit('unsubscribe', (_parse_symbols(symbols),), timeout=5)
+
+    def subscribed_pages(self):
+        """{page: [symbols]} as last requested from the DLL."""
+        return {page: list(syms) for page, syms in list(self._page_symbols.items())}
+
+    def login_state(self):
+        """Whether the quote server is connected, the last login result and what is subscribed."""
+        pages = self.subscribed_pages()
+        return {"connected": self.is_connected, "last_login": self.last_login,
+                "subscribed": sum(len(syms) for syms in pages.values()), "pages": pages}
+
+    def stop(self):
+        self.running = False
+        self.bars.stop()
+        self.bus.close()
+        self.log.close()
+        self.cmd_queue.put(None)
+        if self._wake_event:
+            self._kernel32.SetEvent(self._wake_event)
 
     # Callbacks
     def _on_reply_message(self, login_id, message):
@@ -206,33 +367,62 @@ class CapitalFuturesClient:
 
     def _on_notify_ticks(self, marketNo, strStockNo, ptr, date, timeHMS, timeMicro, bid, ask, close, qty, simulate):
         try:
-            symbol_str = strStockNo.decode('ansi') if isinstance(strStockNo, bytes) else strStockNo
+            # Decoded once per symbol; later ticks reuse the interned name and ring key
+            symbol_str, key = self.symbols.intern(strStockNo)
             # self.write_log(f"[Tick] {symbol_str} {close}") # Verbose but useful
-            
-            quote_data = {
-                "symbol": symbol_str,
-                "date": date,
-                "time": timeHMS,
-                "bid": bid,
-                "ask": ask,
-                "price": close,
-                "qty": qty,
-                "vol": qty
-            }
-            self.latest_quotes[quote_data["symbol"]] = quote_data
-            self.quote_queue.put(quote_data)
+
+            seq = self.ticks.append(key, marketNo, date, timeHMS, timeMicro, bid, ask, close, qty, simulate)
+            self.quotes.update(symbol_str, seq, date, timeHMS, bid, ask, close, qty, simulate)
         except Exception as e:
             self.write_log(f"Tick error: {e}")
 
-    def get_quote_stream(self):
-        while True:
-            try:
-                item = self.quote_queue.get(timeout=1)
-                yield item
-            except Empty:
-                yield None
-            except Exception:
-                break
+    def subscribe_ticks(self, symbols=None, from_seq=None, name=None):
+        """Independent tick subscription (own cursor, optional symbol filter). close() it when done."""
+        return self.bus.subscribe(symbols, from_seq, name)
+
+    def get_quote_stream(self, symbols=None):
+        """Tick dicts as they arrive; blocks while idle. Every caller gets the full stream."""
+        sub = self.subscribe_ticks(symbols, name="quote_stream")
+        try:
+            yield from sub
+        finally:
+            sub.close()
+
+    def get_quote(self, symbol):
+        """Consistent latest Quote for `symbol` (None before its first tick); never blocks the feed."""
+        return self.quotes.get(symbol)
+
+    def quotes_changed_since(self, seq=-1):
+        """([Quote, ...] updated after tick seq `seq`, next seq) for delta pushes."""
+        return self.quotes.changed_since(seq)
+
+    def get_bars(self, symbol, minutes, include_partial=True):
+        """OHLCV DataFrame of `minutes` bars built from the live ticks (see bar_aggregator)."""
+        return self.bars.bars(symbol, minutes, include_partial)
+
+    # --- Capture / replay ---
+    def record(self, path):
+        """Start recording every tick to `path`; call .stop() on the returned recorder."""
+        self.write_log(f"Recording ticks to {path}")
+        return TickRecorder(self.bus, path).start()
+
+    def replay(self, source, speed=1.0, block=False):
+        """
+        Feed a recording (path) or (offset, args) iterable, e.g. tick_replay.synthetic_ticks(),
+        through _on_notify_ticks at `speed` (0 = as fast as possible). Runs on its own thread
+        unless block=True, in which case it returns (ticks_sent, elapsed_seconds).
+        """
+        ticks = read_ticks(source) if isinstance(source, str) else source
+        self.write_log(f"Replaying ticks from {source if isinstance(source, str) else 'iterator'} at {speed or 'max'}x")
+        if block:
+            return replay(ticks, self._on_notify_ticks, speed)
+        thread = threading.Thread(target=replay, args=(ticks, self._on_notify_ticks, speed),
+                                  name="tick-replay", daemon=True)
+        thread.start()
+        return thread
 
+    def tick_stats(self):
+        return {**self.bus.stats(), "bars": self.bars.stats(), "log": self.log.stats(),
+                "quotes": self.quotes.stats(), "pages": self.subscribed_pages()}
 
 client = CapitalFuturesClient.get_instance()
@@ -116,30 +116,76 @@ const App = () => {
   const [quoteSymbols, setQuoteSymbols] = useState("^TWII,NQ=F,2330.TW");
 
   useEffect(() => {
-    const fetchQuotes = async () => {
-      try {
-        const res = await fetch(`/api/quote?symbols=${quoteSymbols}`);
-        const data = await res.json();
-        
-        if (data && !data.error) {
-          setQuotes(data);
-          const now = new Date();
-          setLastUpdated(now.toLocaleTimeString());
-        } else if (data.error) {
-          console.error("API error:", data.error);
-          setQuotes({ error: "API 回傳錯誤" });
+    // Live quotes are pushed over one WebSocket; the server shares a single refresh loop between all clients
+    let ws = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const connect = () => {
+      const proto = window.location.protocol === 'https:' ? 'wss' : 'ws';
+      ws = new WebSocket(`${proto}://${window.location.host}/ws/quotes`);
+
+      ws.onopen = () => {
+        ws.send(JSON.stringify({ action: 'subscribe', symbols: quoteSymbols }));
+      };
+
+      ws.onmessage = (e) => {
+        const msg = JSON.parse(e.data);
+        if (msg.type === 'snapshot') {
+          setQuotes(msg.data);
+        } else if (msg.type === 'quotes') {
+          setQuotes(prev => (prev.error ? msg.data : { ...prev, ...msg.data }));
         }
-      } catch (e) {
-        console.error("Quote fetch error", e);
-        setQuotes({ error: "連線失敗" });
-      }
+        if (Object.keys(msg.data || {}).length > 0) {
+          setLastUpdated(new Date().toLocaleTimeString());
+        }
+      };
+
+      ws.onclose = () => {
+        if (closed) return;
+        setQuotes({ error: "連線中斷，重新連線中..." });
+        retryTimer = setTimeout(connect, 3000);
+      };
+
+      ws.onerror = () => ws.close();
     };
 
-    fetchQuotes();
-    const interval = setInterval(fetchQuotes, 5000);
-    return () => clearInterval(interval);
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (ws) ws.close();
+    };
   }, [quoteSymbols]);
 
+  const pollJob = async (jobId) => {
+    try {
+      while (true) {
+        const res = await fetch(`/api/status?job_id=${jobId}`);
+        if (!res.ok) throw new Error(`status ${res.status}`);
+        const job = await res.json();
+        if (job.status === 'completed') {
+          setStocks(job.data || []);
+          setLoading(false);
+          return;
+        }
+        if (job.status === 'error' || job.status === 'cancelled') {
+          setError(job.status === 'error' ? `Analysis Failed: ${job.error}` : 'Analysis Cancelled');
+          setLoading(false);
+          return;
+        }
+        // Unknown job_id falls back to "idle": the backend no longer has this job
+        if (job.job_id !== jobId) throw new Error('job is no longer available');
+        setProgress(job.progress || 'Processing...');
+        await new Promise(resolve => setTimeout(resolve, 2000));
+      }
+    } catch (err) {
+      console.error(err);
+      setError(`Lost connection to the analysis job: ${err.message}`);
+      setLoading(false);
+    }
+  };
+
   const fetchAnalysis = async () => {
     setLoading(true);
     setError(null);
@@ -147,29 +193,53 @@ const App = () => {
     setManualResult(null);
 
     try {
-      const startRes = await fetch('/api/analyze?force=true', { method: 'POST' });
+      // No force: reuse today's precomputed scan (scheduled after close / before open)
+      const startRes = await fetch('/api/analyze', { method: 'POST' });
       if (!startRes.ok) throw new Error('Failed to start analysis');
-
-      const intervalId = setInterval(async () => {
-        try {
-          const statusRes = await fetch('/api/status');
-          const statusData = await statusRes.json();
-
-          if (statusData.status === 'running') {
-            setProgress(statusData.progress || 'Processing...');
-          } else if (statusData.status === 'completed') {
-            clearInterval(intervalId);
-            setStocks(statusData.data || []);
-            setLoading(false);
-          } else if (statusData.status === 'error') {
-            clearInterval(intervalId);
-            setError(`Analysis Failed: ${statusData.error}`);
-            setLoading(false);
-          }
-        } catch (e) {
-          console.error("Polling error", e);
-        }
-      }, 2000); 
+      const { job_id } = await startRes.json();
+
+      // Server pushes progress, each finished candidate, then a final summary
+      setStocks([]);
+      const source = new EventSource(`/api/analyze/stream?job_id=${job_id}`);
+
+      source.addEventListener('progress', (e) => {
+        const { progress } = JSON.parse(e.data);
+        setProgress(progress || 'Processing...');
+      });
+
+      source.addEventListener('result', (e) => {
+        const result = JSON.parse(e.data);
+        setStocks(prev => [...prev.filter(s => s.symbol !== result.symbol), result]);
+      });
+
+      source.addEventListener('done', (e) => {
+        const summary = JSON.parse(e.data);
+        source.close();
+        // Restore the backend's ranking (results arrive in completion order)
+        const order = summary.symbols || [];
+        setStocks(prev => [...prev].sort((a, b) => order.indexOf(a.symbol) - order.indexOf(b.symbol)));
+        setLoading(false);
+      });
+
+      source.addEventListener('failed', (e) => {
+        const { error } = JSON.parse(e.data);
+        source.close();
+        setError(`Analysis Failed: ${error}`);
+        setLoading(false);
+      });
+
+      source.addEventListener('cancelled', () => {
+        source.close();
+        setError('Analysis Cancelled');
+        setLoading(false);
+      });
+
+      // Stream dropped (backend restarted, job evicted -> 404, proxy timeout): stop the
+      // browser's silent retries and follow the job by polling its status instead
+      source.onerror = () => {
+        source.close();
+        pollJob(job_id);
+      };
     } catch (err) {
       console.error(err);
       setError("Unable to connect to V30 AI Backend. Please ensure the analysis server is running.");
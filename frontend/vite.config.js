@@ -11,6 +11,10 @@ export default defineConfig({
         target: 'http://localhost:8001',
         changeOrigin: true,
         secure: false
+      },
+      '/ws': {
+        target: 'ws://localhost:8001',
+        ws: true
       }
     }
   }
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+import yfinance as yf
+
+from metrics import observe_yfinance
+from cache_files import write_json_atomic
+from scheduler import scan_date
+
+logger = logging.getLogger("Fundamentals")
+
+FUNDAMENTAL_FIELDS = ("revenueGrowth", "grossMargins", "returnOnEquity", "trailingPE")
+FUNDAMENTALS_CACHE_PATH = os.getenv("FUNDAMENTALS_CACHE_PATH", os.path.join("yf_cache", "fundamentals.json"))
+FUNDAMENTALS_WORKERS = int(os.getenv("FUNDAMENTALS_WORKERS", "8"))
+FUNDAMENTALS_TIMEOUT = float(os.getenv("FUNDAMENTALS_TIMEOUT", "20"))
+
+
+def fetch_fundamentals(symbol):
+    """The slow part: yf.Ticker(...).info, trimmed to the fields the AI prompt uses."""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        info = yf.Ticker(symbol).info or {}
+        outcome = "ok" if info else "empty"
+    finally:
+        observe_yfinance("info", time.perf_counter() - t0, outcome)
+    # Drop missing fields so build_summary falls back to its own defaults (e.g. PE "N/A")
+    return {field: info[field] for field in FUNDAMENTAL_FIELDS if info.get(field) is not None}
+
+
+class FundamentalsStore:
+    """
+    Per-symbol cache of the four .info fields used by the AI prompt, valid for the day.
+    `prefetch` fans lookups out to a thread pool; `aget` awaits a result without blocking the event loop.
+    """
+    def __init__(self, path=FUNDAMENTALS_CACHE_PATH, max_workers=FUNDAMENTALS_WORKERS, fetcher=fetch_fundamentals):
+        self.path = path
+        self.fetcher = fetcher
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}   # symbol -> {"date": "YYYY-MM-DD", "data": {...}}
+        self._inflight = {}  # symbol -> Future
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fundamentals")
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Fundamentals cache unreadable, starting empty: {e}")
+
+    def _fresh(self, symbol):
+        entry = self._entries.get(symbol)
+        if entry and entry.get("date") == scan_date():
+            return entry["data"]
+        return None
+
+    def _fetch(self, symbol):
+        try:
+            data = self.fetcher(symbol)
+            with self._lock:
+                self._entries[symbol] = {"date": scan_date(), "data": data}
+            return data
+        except Exception as e:
+            logger.warning(f"Fundamentals fetch failed for {symbol}: {e}")
+            return {}
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+
+    def prefetch(self, symbols):
+        """Start background lookups for every symbol not cached today. Returns immediately."""
+        with self._lock:
+            for symbol in symbols:
+                if self._fresh(symbol) is None and symbol not in self._inflight:
+                    self._inflight[symbol] = self._executor.submit(self._fetch, symbol)
+
+    async def aget(self, symbol, timeout=FUNDAMENTALS_TIMEOUT):
+        """Cached fields for `symbol`; awaits an in-flight prefetch (or starts one). Empty dict on failure."""
+        with self._lock:
+            data = self._fresh(symbol)
+            if data is not None:
+                self.hits += 1
+                return data
+            self.misses += 1
+            future = self._inflight.get(symbol)
+            if future is None:
+                future = self._inflight[symbol] = self._executor.submit(self._fetch, symbol)
+        try:
+            # shield: a timeout here must not cancel the shared prefetch
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except Exception:
+            logger.warning(f"Fundamentals for {symbol} not ready within {timeout}s")
+            return {}
+
+    def save(self):
+        if not self.path:
+            return
+        today = scan_date()
+        with self._lock:
+            snapshot = {k: v for k, v in self._entries.items() if v.get("date") == today}
+        try:
+            write_json_atomic(self.path, snapshot)
+        except Exception as e:
+            logger.error(f"Fundamentals cache save failed: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
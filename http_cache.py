@@ -0,0 +1,83 @@
+import os
+import hashlib
+import logging
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.gzip import GZipMiddleware
+
+logger = logging.getLogger("HttpCache")
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; tiny JSON is not worth it
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))                     # 6 is most of level 9's ratio on JSON at a fraction of the CPU
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+
+class CompressionMiddleware:
+    """
+    Brotli (if brotli-asgi is installed, falling back to gzip per Accept-Encoding) or gzip
+    for every HTTP response except event streams: the compressors buffer streamed chunks,
+    which would hold SSE progress events back until the stream ends.
+    """
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE):
+        self.app = app
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, quality=BROTLI_QUALITY, minimum_size=minimum_size,
+                                               gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=GZIP_LEVEL)
+        logger.info(f"Response compression: {'brotli+gzip' if BrotliMiddleware else 'gzip'}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self._is_stream(scope):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    @staticmethod
+    def _is_stream(scope):
+        for name, value in scope.get("headers", []):
+            if name == b"accept" and b"text/event-stream" in value:
+                return True
+        return scope.get("path", "").endswith("/stream")
+
+
+def _normalize(tag):
+    # nginx weakens strong ETags when it compresses, so compare the weak forms
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _normalize(etag) in {_normalize(t) for t in header.split(",")}
+
+
+def etag_response(request, content, etag=None, status_code=200):
+    """
+    JSON response with an ETag; 304 with an empty body when the client already has it.
+    Pass `etag` when the caller can derive a version cheaply (e.g. a job's event count)
+    and `content` as a callable, so a match skips building and serializing the payload;
+    otherwise the body is hashed.
+    """
+    headers = {"Cache-Control": "no-cache"}
+    if etag is not None and not_modified(request, etag):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+    if callable(content):
+        content = content()
+    response = JSONResponse(jsonable_encoder(content), status_code=status_code)
+    if etag is None:
+        etag = '"' + hashlib.sha1(response.body).hexdigest()[:20] + '"'
+        if not_modified(request, etag):
+            return Response(status_code=304, headers={**headers, "ETag": etag})
+    response.headers.update({**headers, "ETag": etag})
+    return response
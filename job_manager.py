@@ -0,0 +1,209 @@
+import os
+import time
+import uuid
+import json
+import hashlib
+import logging
+import threading
+import concurrent.futures
+from datetime import datetime
+
+from tracing import Trace
+from scheduler import scan_date
+
+logger = logging.getLogger("JobManager")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))            # scans running at the same time
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "20"))       # finished jobs kept in memory
+JOB_TTL = int(os.getenv("JOB_TTL", str(6 * 3600)))          # seconds a finished job is kept
+JOB_DEDUP_WINDOW = int(os.getenv("JOB_DEDUP_WINDOW", "300"))  # completed jobs younger than this are shared
+
+TERMINAL_STATUSES = ("completed", "error", "cancelled")
+TERMINAL_EVENTS = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_fingerprint(params, date=None):
+    """Identity of a scan: its parameters (minus `force`) plus the trading date."""
+    key = {k: v for k, v in params.items() if k != "force"}
+    key["date"] = date or scan_date()
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class Job:
+    """
+    One scan request: parameters, status/progress, results and an append-only event log.
+    Mutated by its worker thread, read by HTTP handlers; all access goes through the lock.
+    """
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = dict(params)
+        self.fingerprint = job_fingerprint(self.params)
+        self.status = "queued"  # queued, running, completed, error, cancelled
+        self.progress = ""
+        self.data = []
+        self.error = None
+        self.extra = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.last_updated = None
+        self.events = []
+        self.trace = Trace()
+        self.future = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- Worker side ---
+    def emit(self, event, data):
+        with self._lock:
+            self.events.append({"id": len(self.events) + 1, "event": event, "data": data})
+            self.last_updated = datetime.now().isoformat()
+
+    def set_progress(self, message):
+        self.check_cancelled()
+        self.progress = message
+        self.emit("progress", {"progress": message})
+
+    def set_status(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status == "running":
+                self.started_at = time.time()
+            elif status in TERMINAL_STATUSES:
+                self.finished_at = time.time()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # --- Reader side ---
+    @property
+    def is_finished(self):
+        return self.status in TERMINAL_STATUSES
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            # Never started: finish it here since no worker will
+            self.set_status("cancelled")
+            self.emit("cancelled", {"status": "cancelled"})
+
+    def events_since(self, cursor):
+        with self._lock:
+            return self.events[cursor:]
+
+    def to_dict(self, include_data=True):
+        with self._lock:
+            d = {
+                "job_id": self.id,
+                "params": self.params,
+                "fingerprint": self.fingerprint,
+                "status": self.status,
+                "progress": self.progress,
+                "error": self.error,
+                "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+                "last_updated": self.last_updated,
+                "result_count": len(self.data),
+                **self.extra,
+            }
+            if include_data:
+                d["data"] = list(self.data)
+            return d
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool (extra submissions queue), keeps finished
+    jobs for JOB_TTL seconds up to JOB_RETENTION of them, then evicts the oldest.
+    `runner(job)` does the work and is responsible for setting the terminal status.
+    """
+    def __init__(self, runner, max_workers=JOB_WORKERS, max_retained=JOB_RETENTION, ttl=JOB_TTL,
+                 dedup_window=JOB_DEDUP_WINDOW):
+        self.runner = runner
+        self.dedup_window = dedup_window
+        self.max_retained = max_retained
+        self.ttl = ttl
+        self._jobs = {}  # insertion-ordered: oldest first
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scan")
+
+    def _run(self, job):
+        job.set_status("running")
+        token = job.trace.activate()
+        try:
+            with job.trace.span("job", cat="job", job_id=job.id):
+                self.runner(job)
+        except JobCancelled:
+            job.set_status("cancelled")
+            job.emit("cancelled", {"status": "cancelled"})
+        except Exception as e:
+            logger.error(f"Job {job.id} crashed: {e}")
+            job.set_status("error", str(e))
+            job.emit("failed", {"status": "error", "error": str(e)})
+        finally:
+            job.trace.finish()
+            job.trace.deactivate(token)
+
+    def submit(self, params):
+        """
+        Returns (job, attached). A request whose fingerprint matches a queued/running job,
+        or one that completed within JOB_DEDUP_WINDOW, attaches to it instead of starting
+        another download-and-analyze cycle. `force` only bypasses the on-disk day cache.
+        """
+        fingerprint = job_fingerprint(params)
+        with self._lock:
+            existing = self._find_shareable(fingerprint)
+            if existing is not None:
+                logger.info(f"Job request {params} attached to {existing.id} ({existing.status})")
+                return existing, True
+            job = Job(params)
+            self._evict()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        logger.info(f"Job {job.id} queued: {job.params}")
+        return job, False
+
+    def _find_shareable(self, fingerprint):
+        """Caller holds the lock. Newest matching job that is in flight or freshly completed."""
+        now = time.time()
+        for job in reversed(self._jobs.values()):
+            if job.fingerprint != fingerprint:
+                continue
+            if not job.is_finished:
+                return job
+            if job.status == "completed" and now - (job.finished_at or 0) <= self.dedup_window:
+                return job
+        return None
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self):
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job and not job.is_finished:
+            job.cancel()
+        return job
+
+    def _evict(self):
+        """Drop expired finished jobs, then the oldest finished ones beyond max_retained. Caller holds the lock."""
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j.is_finished]
+        expired = {j.id for j in finished if now - (j.finished_at or now) > self.ttl}
+        remaining = [j for j in finished if j.id not in expired]
+        overflow = {j.id for j in remaining[:max(0, len(remaining) - self.max_retained)]}
+        for job_id in expired | overflow:
+            del self._jobs[job_id]
@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+
+from ai_client import RATING_LABELS, TokenBucket, gemini_bucket
+
+logger = logging.getLogger("LLMBackends")
+
+# --- Backend Selection ---
+# AI_BACKEND=gemini (default) | stub
+AI_BACKEND = os.getenv("AI_BACKEND", "gemini").lower()
+AI_STUB_LATENCY = float(os.getenv("AI_STUB_LATENCY", "0"))  # seconds per call
+AI_STUB_RPM = float(os.getenv("AI_STUB_RPM", "0"))          # 0 = no pacing for the stub
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+API_KEY = os.getenv("GEMINI_API_KEY", "")
+
+
+class Advisor:
+    """
+    Interface every LLM backend implements (same shape as genai.GenerativeModel).
+    `name` namespaces the advice cache so backends never serve each other's answers.
+    `bucket` is the TokenBucket pacing this backend's calls, or None for no pacing.
+    """
+    name = "base"
+    bucket = None
+
+    def generate_content(self, prompt, **kwargs):
+        raise NotImplementedError
+
+    async def generate_content_async(self, prompt, **kwargs):
+        raise NotImplementedError
+
+
+class GeminiAdvisor(Advisor):
+    """
+    Google Gemini. The SDK is imported and configured on first call, not at import time.
+    Requires GEMINI_API_KEY; calls share the process-wide Gemini quota bucket.
+    """
+    def __init__(self, model_name=GEMINI_MODEL, api_key=API_KEY, bucket=gemini_bucket):
+        self.name = model_name
+        self.api_key = api_key
+        self.bucket = bucket
+        if not api_key:
+            logger.warning("GEMINI_API_KEY is not set; AI advice will fail until it is")
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if not self.api_key:
+                        raise RuntimeError("GEMINI_API_KEY is not set")
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.name)
+                    logger.info(f"Gemini client ready: {self.name}")
+        return self._model
+
+    def generate_content(self, prompt, **kwargs):
+        return self._get_model().generate_content(prompt, **kwargs)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return await self._get_model().generate_content_async(prompt, **kwargs)
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubAdvisor(Advisor):
+    """
+    Deterministic offline backend for tests, load tests and benchmarks.
+    Answers both the per-symbol and the batched JSON prompt after a configurable delay;
+    the same symbol always gets the same rating. `calls` counts requests.
+    Unpaced unless rpm (AI_STUB_RPM) is given, so benchmarks measure the pipeline, not a quota.
+    """
+    name = "stub"
+
+    def __init__(self, latency=AI_STUB_LATENCY, rpm=AI_STUB_RPM):
+        self.latency = latency
+        self.bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.calls = 0
+
+    def _reply(self, prompt):
+        self.calls += 1
+        rows = []
+        for symbol in re.findall(r"股票代碼: (\S+)", prompt):
+            rating = RATING_LABELS[int(hashlib.md5(symbol.encode("utf-8")).hexdigest(), 16) % len(RATING_LABELS)]
+            rows.append({"symbol": symbol, "rating": rating, "advice": f"{rating}：本地模擬建議 ({symbol})"})
+        if "JSON" in prompt:
+            return _StubResponse(json.dumps(rows, ensure_ascii=False))
+        return _StubResponse(rows[0]["advice"] if rows else "觀察：無數據")
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(prompt)
+
+
+BACKENDS = {
+    "gemini": GeminiAdvisor,
+    "stub": StubAdvisor,
+}
+
+
+def get_advisor(backend=AI_BACKEND):
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown AI_BACKEND '{backend}', using gemini")
+        backend = "gemini"
+    return BACKENDS[backend]()
@@ -0,0 +1,124 @@
+import os
+import atexit
+import threading
+from queue import Queue, Empty, Full
+from datetime import datetime
+
+LOG_MAX_BYTES = int(os.getenv("CAPITAL_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("CAPITAL_LOG_BACKUPS", "3"))
+LOG_FLUSH_INTERVAL = float(os.getenv("CAPITAL_LOG_FLUSH_INTERVAL", "0.5"))  # seconds
+LOG_QUEUE_SIZE = int(os.getenv("CAPITAL_LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = 500
+
+
+class BatchedLogWriter:
+    """
+    Append-only log file written by a background thread.
+    write() only timestamps the line and enqueues it, so callers (including DLL callbacks)
+    never touch the filesystem; when the queue is full the line is dropped and counted
+    rather than blocking, as are lines written after close(). The writer keeps the file open, writes queued lines in one call
+    per batch, and rotates to path.1 .. path.N once the file exceeds max_bytes.
+    """
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+                 flush_interval=LOG_FLUSH_INTERVAL, max_queue=LOG_QUEUE_SIZE, batch_size=LOG_BATCH_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self._queue = Queue(maxsize=max_queue)
+        self._file = None
+        self.closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, msg):
+        if self.closed:
+            # The writer thread is gone (or going); nothing would ever write this line
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(f"{datetime.now()} {msg}\n")
+        except Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            stop = None in batch
+            self._write_batch([line for line in batch if line is not None])
+            if stop:
+                return
+
+    def _write_batch(self, lines):
+        if not lines:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.written += len(lines)
+            self.batches += 1
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except Exception:
+            # Logging must never take the feed down; count the lines as lost
+            self.dropped += len(lines)
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+    def close(self, timeout=2.0):
+        """Write what is queued and stop the writer thread."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except Full:
+            return
+        self._thread.join(timeout)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+        }
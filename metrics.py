@@ -0,0 +1,243 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Prometheus text exposition (format 0.0.4) without the client library: counters, gauges,
+# histograms and callback gauges, each guarded by its own lock. Recording a sample is a dict
+# lookup plus a bisect, so it is cheap enough for every request.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackGauge(_Metric):
+    """Values are read at scrape time from `fn()`, which returns [(labels_dict, value), ...]."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames, fn):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def render(self):
+        try:
+            samples = self.fn()
+        except Exception:
+            samples = []
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, self._key(labels))} {_format_value(v)}"
+                                for labels, v in samples]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = self.header()
+        for key, counts, total, n in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="%s"' % _format_value(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name, help_text, labelnames, fn):
+        return self._add(CallbackGauge(name, help_text, labelnames, fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "pystock_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"))
+YF_CALLS = REGISTRY.counter(
+    "pystock_yfinance_calls_total", "Upstream yfinance calls by kind and outcome (ok, empty, error).", ("call", "outcome"))
+YF_LATENCY = REGISTRY.histogram(
+    "pystock_yfinance_call_duration_seconds", "Upstream yfinance call latency.", ("call",), SLOW_BUCKETS)
+GEMINI_LATENCY = REGISTRY.histogram(
+    "pystock_gemini_request_duration_seconds", "Gemini generate_content latency by outcome.", ("outcome",), SLOW_BUCKETS)
+SCAN_PHASE = REGISTRY.histogram(
+    "pystock_scan_phase_duration_seconds", "Duration of each run_analysis_task phase.", ("phase",), SLOW_BUCKETS)
+SCAN_CACHE = REGISTRY.counter(
+    "pystock_scan_day_cache_total", "Scan requests served from the stored day results (hit) or recomputed (miss).", ("outcome",))
+
+
+def observe_yfinance(call, seconds, outcome):
+    YF_CALLS.inc(call=call, outcome=outcome)
+    YF_LATENCY.observe(seconds, call=call)
+
+
+def executor_samples(executors):
+    """
+    Saturation of named ThreadPoolExecutors: configured size, live threads, busy threads
+    and tasks waiting in the queue. Reads CPython internals, so missing ones count as 0.
+    """
+    samples = []
+    for name, executor in executors.items():
+        threads = len(getattr(executor, "_threads", ()))
+        idle_sem = getattr(executor, "_idle_semaphore", None)
+        idle = getattr(idle_sem, "_value", 0) if idle_sem is not None else 0
+        queue = getattr(executor, "_work_queue", None)
+        samples += [
+            ({"executor": name, "state": "max_workers"}, getattr(executor, "_max_workers", 0)),
+            ({"executor": name, "state": "threads"}, threads),
+            ({"executor": name, "state": "busy"}, max(0, threads - idle)),
+            ({"executor": name, "state": "queued"}, queue.qsize() if queue is not None else 0),
+        ]
+    return samples
+
+
+def limiter_samples(name, limiter):
+    """
+    Same states for an AnyIO CapacityLimiter, e.g. the default threadpool that runs every sync
+    FastAPI handler: total tokens, borrowed (busy) tokens and tasks waiting for one.
+    """
+    return [
+        ({"executor": name, "state": "max_workers"}, limiter.total_tokens),
+        ({"executor": name, "state": "busy"}, limiter.borrowed_tokens),
+        ({"executor": name, "state": "queued"}, limiter.statistics().tasks_waiting),
+    ]
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding HTTP_LATENCY. Labels use the matched route template
+    (/api/jobs/{job_id}), not the raw path, so cardinality stays bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.observe(time.perf_counter() - t0, method=scope.get("method", ""),
+                                 route=getattr(route, "path", "other"), status=status["code"])
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger("QuoteHub")
+
+QUOTE_REFRESH_SECONDS = float(os.getenv("QUOTE_REFRESH_SECONDS", "5"))
+QUOTE_SEND_TIMEOUT = float(os.getenv("QUOTE_SEND_TIMEOUT", "5"))   # a client slower than this is dropped
+QUOTE_MAX_SYMBOLS = int(os.getenv("QUOTE_MAX_SYMBOLS", "20"))      # per client
+QUOTE_LIVE_INTERVAL = float(os.getenv("QUOTE_LIVE_INTERVAL", "0.25"))  # live feed delta polling
+# Per-fetch fields that change on every refresh without the quote changing
+VOLATILE_KEYS = ("latency_ms",)
+
+
+def same_quote(a, b):
+    if a is None or b is None:
+        return a is b
+    return {k: v for k, v in a.items() if k not in VOLATILE_KEYS} == \
+        {k: v for k, v in b.items() if k not in VOLATILE_KEYS}
+
+
+def parse_symbols(value):
+    """Accepts a list or a comma separated string; returns de-duplicated symbols in order."""
+    if isinstance(value, str):
+        value = value.split(",")
+    seen = []
+    for s in value or []:
+        s = str(s).strip()
+        if s and s not in seen:
+            seen.append(s)
+    return seen[:QUOTE_MAX_SYMBOLS]
+
+
+class QuoteHub:
+    """
+    Shared live-quote fan-out for websocket clients.
+    One refresh loop fetches the union of all subscribed symbols once per interval and pushes
+    each client only the quotes that changed, so upstream calls scale with distinct symbols,
+    not with connected clients. The loop runs only while someone is connected.
+    `fetch(symbol)` is an async callable returning the same dict as /api/quote.
+    `live(cursor, symbols)`, if given, returns ({symbol: quote}, next_cursor) for quotes a live
+    feed updated since `cursor`; those are pushed every live_interval instead of waiting
+    for the next refresh.
+    """
+    def __init__(self, fetch, interval=QUOTE_REFRESH_SECONDS, send_timeout=QUOTE_SEND_TIMEOUT,
+                 live=None, live_interval=QUOTE_LIVE_INTERVAL):
+        self.fetch = fetch
+        self.interval = interval
+        self.send_timeout = send_timeout
+        self.live = live
+        self.live_interval = live_interval
+        self.clients = {}   # websocket -> set of symbols
+        self.latest = {}    # symbol -> last quote pushed
+        self.upstream_fetches = 0
+        self.refreshes = 0
+        self.live_pushes = 0
+        self._task = None
+        self._live_task = None
+        self._wake = None
+
+    # --- Client side ---
+    async def connect(self, ws):
+        await ws.accept()
+        self.clients[ws] = set()
+        self._ensure_loop()
+
+    def disconnect(self, ws):
+        self.clients.pop(ws, None)
+
+    async def subscribe(self, ws, symbols):
+        """Replace the client's symbol set. Known quotes are sent at once; new symbols trigger a refresh."""
+        symbols = parse_symbols(symbols)
+        self.clients[ws] = set(symbols)
+        snapshot = {s: self.latest[s] for s in symbols if s in self.latest}
+        await self._send(ws, {"type": "snapshot", "symbols": symbols, "data": snapshot})
+        if len(snapshot) < len(symbols) and self._wake is not None:
+            self._wake.set()
+
+    # --- Refresh loop ---
+    def _ensure_loop(self):
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop())
+        if self.live is not None and (self._live_task is None or self._live_task.done()):
+            self._live_task = asyncio.create_task(self._live_loop())
+
+    def watched(self):
+        symbols = set()
+        for subs in list(self.clients.values()):
+            symbols |= subs
+        return symbols
+
+    async def _loop(self):
+        logger.info("Quote refresh loop started")
+        while self.clients:
+            symbols = sorted(self.watched())
+            if symbols:
+                await self.refresh(symbols)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("Quote refresh loop stopped (no clients)")
+
+    async def _live_loop(self):
+        cursor = -1
+        while self.clients:
+            await asyncio.sleep(self.live_interval)
+            symbols = self.watched()
+            if not symbols:
+                continue
+            try:
+                quotes, cursor = self.live(cursor, symbols)
+            except Exception as e:
+                logger.warning(f"Live quote poll failed: {e}")
+                continue
+            changed = {s: q for s, q in quotes.items() if s in symbols and not same_quote(self.latest.get(s), q)}
+            if changed:
+                self.latest.update(changed)
+                self.live_pushes += len(changed)
+                await self.broadcast(changed)
+
+    async def refresh(self, symbols):
+        self.refreshes += 1
+        self.upstream_fetches += len(symbols)
+        quotes = await asyncio.gather(*(self.fetch(s) for s in symbols), return_exceptions=True)
+        changed = {}
+        for symbol, quote in zip(symbols, quotes):
+            if isinstance(quote, Exception):
+                quote = {"error": str(quote)}
+            if not same_quote(self.latest.get(symbol), quote):
+                self.latest[symbol] = quote
+                changed[symbol] = quote
+        # Forget symbols nobody watches any more
+        for symbol in set(self.latest) - self.watched():
+            del self.latest[symbol]
+        if changed:
+            await self.broadcast(changed)
+        return changed
+
+    async def broadcast(self, changed):
+        ts = time.time()
+        sends = []
+        for ws, subs in list(self.clients.items()):
+            payload = {s: changed[s] for s in subs if s in changed}
+            if payload:
+                sends.append(self._send(ws, {"type": "quotes", "ts": ts, "data": payload}))
+        await asyncio.gather(*sends)
+
+    async def _send(self, ws, message):
+        try:
+            await asyncio.wait_for(ws.send_json(message), timeout=self.send_timeout)
+        except Exception as e:
+            logger.info(f"Dropping quote client: {e}")
+            self.disconnect(ws)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "symbols": len(self.watched()),
+            "refreshes": self.refreshes,
+            "upstream_fetches": self.upstream_fetches,
+            "live_pushes": self.live_pushes,
+            "interval": self.interval,
+        }
@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+
+from tick_buffer import Quote
+from bar_aggregator import session_bounds, tick_datetime
+
+logger = logging.getLogger("QuoteSnapshot")
+
+# Slots are allocated once up front; a symbol takes one when it is subscribed (or on its
+# first tick). Sized for every page of a full subscription by default.
+QUOTE_SLOTS = int(os.getenv("CAPITAL_QUOTE_SLOTS", "2500"))
+READ_SPINS = 100   # seqlock retries before a reader yields its time slice
+
+QUOTE_DTYPE = np.dtype([
+    ("seq", "i8"),       # tick seq (TickRing) of the last update; -1 before the first tick
+    ("date", "i4"),
+    ("time", "i4"),
+    ("bid", "f8"),
+    ("ask", "f8"),
+    ("price", "f8"),
+    ("qty", "i8"),       # last tick size
+    ("volume", "i8"),    # cumulative over the current TAIFEX session
+])
+
+
+def _stamp(ts):
+    """datetime -> YYYYMMDDHHMMSS int, comparable with date * 1000000 + time_hms."""
+    return ((ts.year * 100 + ts.month) * 100 + ts.day) * 1000000 + ts.hour * 10000 + ts.minute * 100 + ts.second
+
+
+class QuoteTable:
+    """
+    Latest quote per symbol in a preallocated structured array, written by the DLL callback
+    thread and read by HTTP/WebSocket handlers without locks (seqlock): the writer makes a
+    slot's version odd, stores the row, then makes it even again; a reader copies the row
+    and retries if the version was odd or changed meanwhile, so it never sees a torn quote
+    and never blocks the writer.
+    Simulated (pre-open trial match) ticks are counted but never become the last price or
+    add to the volume, matching the bar aggregator. Volume restarts with each TAIFEX session.
+    """
+    def __init__(self, slots=QUOTE_SLOTS):
+        self.slots = slots
+        self.rows = np.zeros(slots, dtype=QUOTE_DTYPE)
+        self.rows["seq"] = -1
+        # Plain list: int bumps on numpy scalars cost microseconds, list items ~50ns
+        self.versions = [0] * slots
+        self.names = []            # slot -> symbol
+        self.last_seq = -1         # seq of the newest update in the table
+        self.full = 0              # updates dropped because every slot was taken
+        self.retries = 0           # reader retries (writer was mid-update)
+        self.simulated = 0         # simulated ticks left out of the table
+        self._index = {}           # symbol -> slot
+        self._volume = [0] * slots
+        # Session the slot's volume belongs to, as YYYYMMDDHHMMSS bounds (writer only)
+        self._session = [(0, -1)] * slots
+        self._alloc_lock = threading.Lock()
+
+    def allocate(self, symbol):
+        """Slot for `symbol`, taking a free one if needed; None when the table is full."""
+        slot = self._index.get(symbol)
+        if slot is not None:
+            return slot
+        with self._alloc_lock:
+            slot = self._index.get(symbol)
+            if slot is None and len(self.names) < self.slots:
+                slot = len(self.names)
+                self.names.append(symbol)
+                self._index[symbol] = slot   # published last: readers only look slots up here
+        return slot
+
+    def update(self, symbol, seq, date, time_hms, bid, ask, price, qty, simulate=0):
+        """Writer side; only the tick callback thread calls this."""
+        if simulate:
+            self.simulated += 1
+            return
+        slot = self._index.get(symbol)
+        if slot is None:
+            slot = self.allocate(symbol)
+            if slot is None:
+                if not self.full:
+                    logger.warning(f"Quote table full ({self.slots} slots); {symbol} not tracked")
+                self.full += 1
+                return
+        stamp = date * 1000000 + time_hms
+        start, end = self._session[slot]
+        if not start <= stamp <= end:
+            bounds = session_bounds(tick_datetime(date, time_hms))
+            # Ticks between sessions (or out of order before the session) keep the current volume
+            if bounds is not None and _stamp(bounds[0]) > start:
+                self._session[slot] = (_stamp(bounds[0]), _stamp(bounds[1]))
+                self._volume[slot] = 0
+        volume = self._volume[slot] + qty
+        self._volume[slot] = volume
+        versions = self.versions
+        versions[slot] += 1   # odd: update in progress
+        self.rows[slot] = (seq, date, time_hms, bid, ask, price, qty, volume)
+        versions[slot] += 1
+        self.last_seq = seq
+
+    def _read(self, slot):
+        """Consistent copy of one slot as a Quote."""
+        versions, rows = self.versions, self.rows
+        spins = 0
+        while True:
+            before = versions[slot]
+            row = rows[slot].item()
+            if not before & 1 and versions[slot] == before:
+                break
+            self.retries += 1
+            spins += 1
+            if spins % READ_SPINS == 0:
+                time.sleep(0)
+        quote = Quote(self.names[slot])
+        quote.seq, quote.date, quote.time, quote.bid, quote.ask, quote.price, quote.qty, quote.volume = row
+        return quote
+
+    # --- Readers ---
+    def get(self, symbol):
+        """Latest Quote for `symbol`, or None if it has no slot or no tick yet."""
+        slot = self._index.get(symbol)
+        if slot is None or not self.versions[slot]:
+            return None
+        return self._read(slot)
+
+    def snapshot(self, symbols=None):
+        """{symbol: Quote} for the given symbols (default: every symbol that has ticked)."""
+        names = list(self.names) if symbols is None else symbols
+        quotes = {}
+        for symbol in names:
+            quote = self.get(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def changed_since(self, seq):
+        """
+        Quotes updated after tick seq `seq` (pass -1 for all), plus the seq to pass next time.
+        Scans the seq column of the used slots, then reads only the changed ones.
+        """
+        last = self.last_seq
+        used = len(self.names)
+        changed = np.flatnonzero(self.rows["seq"][:used] > seq)
+        return [self._read(int(slot)) for slot in changed], max(last, seq)
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "used": len(self.names),
+            "last_seq": self.last_seq,
+            "full": self.full,
+            "reader_retries": self.retries,
+            "simulated": self.simulated,
+            "bytes": self.rows.nbytes,
+        }
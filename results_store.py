@@ -0,0 +1,158 @@
+import os
+import json
+import base64
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime
+
+logger = logging.getLogger("ResultsStore")
+
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "scan_results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_date   TEXT NOT NULL,
+    scan_key    TEXT NOT NULL,
+    params      TEXT,
+    created_at  TEXT,
+    UNIQUE (scan_date, scan_key)
+);
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id     INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    scan_date   TEXT NOT NULL,
+    scan_key    TEXT NOT NULL,
+    rank        INTEGER NOT NULL,
+    symbol      TEXT NOT NULL,
+    status      TEXT,
+    dist        TEXT,
+    advice      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_scan ON results (scan_id, rank);
+CREATE INDEX IF NOT EXISTS idx_results_date_status ON results (scan_date, status);
+CREATE INDEX IF NOT EXISTS idx_results_symbol_date ON results (symbol, scan_date);
+CREATE TABLE IF NOT EXISTS charts (
+    result_id   INTEGER PRIMARY KEY REFERENCES results(id) ON DELETE CASCADE,
+    png         BLOB NOT NULL
+);
+"""
+
+RESULT_COLUMNS = "r.id, r.scan_date, r.scan_key, r.rank, r.symbol, r.status, r.dist, r.advice"
+
+
+def result_select(include_charts):
+    """SELECT ... FROM results r, with the chart joined in only when asked for."""
+    if include_charts:
+        return f"SELECT {RESULT_COLUMNS}, c.png FROM results r LEFT JOIN charts c ON c.result_id = r.id"
+    return f"SELECT {RESULT_COLUMNS} FROM results r"
+
+
+class ResultsStore:
+    """
+    Scan results in SQLite: one row per (scan, symbol), indexed by date, symbol and status,
+    with charts kept as raw PNG blobs in their own table so listing queries never touch them.
+    Each call opens (and closes) its own connection, so the store is safe to share across threads.
+    """
+    def __init__(self, path=RESULTS_DB_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # --- Writes ---
+    def save_scan(self, scan_date, scan_key, params, results):
+        """Replace the stored results of one (date, key) scan atomically."""
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM scans WHERE scan_date = ? AND scan_key = ?", (scan_date, scan_key))
+            cur = conn.execute(
+                "INSERT INTO scans (scan_date, scan_key, params, created_at) VALUES (?, ?, ?, ?)",
+                (scan_date, scan_key, json.dumps(params, ensure_ascii=False), datetime.now().isoformat()))
+            scan_id = cur.lastrowid
+            for rank, r in enumerate(results):
+                cur = conn.execute(
+                    "INSERT INTO results (scan_id, scan_date, scan_key, rank, symbol, status, dist, advice) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (scan_id, scan_date, scan_key, rank, r.get("symbol"), r.get("status"), r.get("dist"), r.get("advice")))
+                if r.get("chart"):
+                    conn.execute("INSERT INTO charts (result_id, png) VALUES (?, ?)",
+                                 (cur.lastrowid, base64.b64decode(r["chart"])))
+
+    def import_legacy_json(self, path, scan_date, scan_key, params=None):
+        """One-off migration of an old cache_{date}.json file. Returns True if imported."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            self.save_scan(scan_date, scan_key, params or {}, results)
+            logger.info(f"Imported legacy cache {path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Legacy cache import failed for {path}: {e}")
+            return False
+
+    # --- Reads ---
+    def has_scan(self, scan_date, scan_key):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT 1 FROM scans WHERE scan_date = ? AND scan_key = ?", (scan_date, scan_key)).fetchone()
+            return row is not None
+
+    @staticmethod
+    def _rows_to_results(rows, include_charts):
+        results = []
+        for row in rows:
+            item = {"symbol": row["symbol"], "dist": row["dist"], "advice": row["advice"], "status": row["status"]}
+            if include_charts:
+                item["chart"] = base64.b64encode(row["png"]).decode('utf-8') if row["png"] else None
+            results.append(item)
+        return results
+
+    def load_scan(self, scan_date, scan_key, include_charts=True, status=None):
+        """Results of one scan in rank order, or None if that scan was never stored."""
+        with closing(self._connect()) as conn, conn:
+            scan = conn.execute("SELECT id FROM scans WHERE scan_date = ? AND scan_key = ?", (scan_date, scan_key)).fetchone()
+            if scan is None:
+                return None
+            sql = f"{result_select(include_charts)} WHERE r.scan_id = ?"
+            args = [scan["id"]]
+            if status:
+                sql += " AND r.status = ?"
+                args.append(status)
+            rows = conn.execute(sql + " ORDER BY r.rank", args).fetchall()
+            return self._rows_to_results(rows, include_charts)
+
+    def query(self, scan_date=None, symbol=None, status=None, scan_key=None, include_charts=False, limit=200):
+        """Filtered results across scans, newest day first (e.g. today's 強烈推薦 only)."""
+        clauses, args = [], []
+        for column, value in (("scan_date", scan_date), ("symbol", symbol), ("status", status), ("scan_key", scan_key)):
+            if value:
+                clauses.append(f"r.{column} = ?")
+                args.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                f"{result_select(include_charts)} {where} ORDER BY r.scan_date DESC, r.scan_key, r.rank LIMIT ?",
+                args + [limit]).fetchall()
+            results = self._rows_to_results(rows, include_charts)
+            for item, row in zip(results, rows):
+                item["date"] = row["scan_date"]
+                item["scan_key"] = row["scan_key"]
+            return results
+
+    def days_passed(self, symbol, scan_key=None):
+        """Every scan date on which `symbol` made the candidate list, newest first."""
+        sql = "SELECT DISTINCT scan_date FROM results WHERE symbol = ?"
+        args = [symbol]
+        if scan_key:
+            sql += " AND scan_key = ?"
+            args.append(scan_key)
+        with closing(self._connect()) as conn, conn:
+            return [row["scan_date"] for row in conn.execute(sql + " ORDER BY scan_date DESC", args)]
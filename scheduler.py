@@ -0,0 +1,98 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("Scheduler")
+
+# Taiwan has no DST, so a fixed UTC+8 offset avoids depending on tzdata in slim images
+TW_TZ = timezone(timedelta(hours=8))
+
+# Default: after the TWSE close (13:30) and before the next open (09:00)
+SCAN_SCHEDULE = os.getenv("SCAN_SCHEDULE", "14:00,08:00")
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+
+
+def scan_date(now=None):
+    """Trading date a scan belongs to: today in Taipei, whatever the server's timezone."""
+    return (now or datetime.now(TW_TZ)).strftime('%Y-%m-%d')
+
+
+def parse_schedule(spec):
+    """'14:00,08:00' -> sorted [(8, 0), (14, 0)]; malformed entries are skipped."""
+    times = set()
+    for part in spec.split(","):
+        try:
+            hour, minute = part.strip().split(":")
+            times.add((int(hour), int(minute)))
+        except ValueError:
+            if part.strip():
+                logger.warning(f"Ignoring bad schedule entry: {part!r}")
+    return sorted(times)
+
+
+class DailyScheduler:
+    """
+    Runs `action()` at fixed Taipei wall-clock times on trading weekdays (Mon-Fri).
+    A single daemon thread sleeps on an Event until the next slot, so stop() wakes it immediately.
+    """
+    def __init__(self, action, times, tz=TW_TZ, weekdays_only=True):
+        self.action = action
+        self.times = times
+        self.tz = tz
+        self.weekdays_only = weekdays_only
+        self.last_run = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_run(self, now=None):
+        if not self.times:
+            return None
+        now = now or datetime.now(self.tz)
+        for day_offset in range(8):
+            day = now.date() + timedelta(days=day_offset)
+            if self.weekdays_only and day.weekday() >= 5:
+                continue
+            for hour, minute in self.times:
+                candidate = datetime(day.year, day.month, day.day, hour, minute, tzinfo=self.tz)
+                if candidate > now:
+                    return candidate
+        return None
+
+    def start(self):
+        if self._thread is not None or not self.times:
+            return
+        self._thread = threading.Thread(target=self._loop, name="scan-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduler started, next run at {self.next_run()}")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            target = self.next_run()
+            if target is None:
+                return
+            wait = (target - datetime.now(self.tz)).total_seconds()
+            if self._stop.wait(max(0.0, wait)):
+                return
+            logger.info(f"Scheduled run at {target}")
+            self.last_run = datetime.now(self.tz).isoformat()
+            try:
+                self.action()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Scheduled run failed: {e}")
+
+    def to_dict(self):
+        next_run = self.next_run()
+        return {
+            "times": [f"{h:02d}:{m:02d}" for h, m in self.times],
+            "next_run": next_run.isoformat() if next_run else None,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
@@ -0,0 +1,82 @@
+import asyncio
+
+from google.api_core import exceptions
+
+from ai_client import AsyncAdvisorClient, parse_batch_response, parse_rating
+
+# Run with `python -m pytest test_ai_client.py` or `python test_ai_client.py`.
+SYMBOLS = ["2330.TW", "2317.TW", "1101.TW"]
+
+
+def test_parses_array_and_prefixes_rating():
+    text = ('[{"symbol": "2330.TW", "rating": "強烈推薦", "advice": "營收動能強"},'
+            ' {"symbol": "2317.TW", "rating": "穩健", "advice": "穩健：評價合理"}]')
+    assert parse_batch_response(text, SYMBOLS) == {"2330.TW": "強烈推薦：營收動能強", "2317.TW": "穩健：評價合理"}
+
+
+def test_ignores_prose_around_the_array():
+    text = '好的，以下是分析：\n```json\n[{"symbol": "1101.TW", "rating": "觀察", "advice": "量能不足"}]\n```'
+    assert parse_batch_response(text, SYMBOLS) == {"1101.TW": "觀察：量能不足"}
+
+
+def test_malformed_json_returns_nothing():
+    assert parse_batch_response('[{"symbol": "2330.TW", "rating": "穩健", "advice": ', SYMBOLS) == {}
+    assert parse_batch_response('[{"symbol": "2330.TW",, }]', SYMBOLS) == {}
+    assert parse_batch_response("無法提供建議", SYMBOLS) == {}
+    assert parse_batch_response("", SYMBOLS) == {}
+    assert parse_batch_response(None, SYMBOLS) == {}
+    assert parse_batch_response('{"symbol": "2330.TW"}', SYMBOLS) == {}
+
+
+def test_unknown_rating_and_bad_rows_are_dropped():
+    text = ('[{"symbol": "2330.TW", "rating": "買進", "advice": "看好"},'
+            ' {"symbol": "2317.TW", "rating": "穩健", "advice": ""},'
+            ' "1101.TW 觀察",'
+            ' {"symbol": "1101.TW", "rating": "觀察", "advice": "等待突破"}]')
+    assert parse_batch_response(text, SYMBOLS) == {"1101.TW": "觀察：等待突破"}
+
+
+def test_missing_and_unrequested_symbols():
+    text = ('[{"symbol": "2330.TW", "rating": "穩健", "advice": "OK"},'
+            ' {"symbol": "9999.TW", "rating": "穩健", "advice": "沒問的"}]')
+    parsed = parse_batch_response(text, SYMBOLS)
+    # Only requested symbols come back; the missing ones are left for per-symbol fallback
+    assert parsed == {"2330.TW": "穩健：OK"}
+    assert [s for s in SYMBOLS if s not in parsed] == ["2317.TW", "1101.TW"]
+
+
+def test_symbols_match_without_suffix_or_case():
+    text = ('[{"symbol": "2330", "rating": "穩健", "advice": "A"},'
+            ' {"symbol": "2317.tw", "rating": "觀察", "advice": "B"},'
+            ' {"symbol": " 6488.TWO ", "rating": "穩健", "advice": "C"}]')
+    parsed = parse_batch_response(text, SYMBOLS + ["6488.TWO"])
+    assert parsed == {"2330.TW": "穩健：A", "2317.TW": "觀察：B", "6488.TWO": "穩健：C"}
+
+
+def test_parse_rating_defaults_to_watch():
+    assert parse_rating("強烈推薦：營收動能強") == "強烈推薦"
+    assert parse_rating("AI 錯誤: timeout") == "觀察"
+
+
+class RateLimitedModel:
+    calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        raise exceptions.ResourceExhausted("quota")
+
+
+def test_no_backoff_after_the_last_rate_limited_attempt():
+    model = RateLimitedModel()
+    client = AsyncAdvisorClient(model, max_retries=3)
+    delays = []
+    client._backoff_delay = lambda attempt: delays.append(attempt) or 0
+    advice = asyncio.run(client._generate("prompt", "2330.TW", asyncio.Semaphore(1)))
+    assert advice.startswith("AI 分析暫時無法使用")
+    assert model.calls == 3
+    assert delays == [0, 1]
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import bar_aggregator
+from bar_aggregator import BarAggregator, session_bounds, bar_start
+
+# Run with `python -m pytest test_bar_aggregator.py` or `python test_bar_aggregator.py`.
+# Prices are raw Capital integers (scaled by 100), like the DLL callback delivers.
+DAY = 20261019
+
+
+def feed(agg, symbol, date, time_hms, price, qty=1):
+    agg.on_tick(symbol, date, time_hms, price * 100, qty)
+
+
+def closed(agg, symbol, minutes):
+    return agg.bars(symbol, minutes, include_partial=False)
+
+
+def test_session_bounds():
+    day = datetime(2026, 10, 19)
+    assert session_bounds(day.replace(hour=8, minute=45)) == (day.replace(hour=8, minute=45), day.replace(hour=13, minute=45))
+    assert session_bounds(day.replace(hour=13, minute=45)) == (day.replace(hour=8, minute=45), day.replace(hour=13, minute=45))
+    # Night session runs from 15:00 into the next calendar day
+    night = (day.replace(hour=15), day.replace(hour=5) + timedelta(days=1))
+    assert session_bounds(day.replace(hour=23, minute=59)) == night
+    assert session_bounds(day.replace(hour=2) + timedelta(days=1)) == night
+    assert session_bounds(day.replace(hour=5) + timedelta(days=1)) == night
+    # Between sessions
+    assert session_bounds(day.replace(hour=14)) is None
+    assert session_bounds(day.replace(hour=5, second=1)) is None
+    assert session_bounds(day.replace(hour=8, minute=44, second=59)) is None
+
+
+def test_bar_start_anchoring_and_closing_ticks():
+    day = datetime(2026, 10, 19)
+    # 60m bars are anchored at 08:45, not on the hour
+    assert bar_start(day.replace(hour=9, minute=50), 60) == (day.replace(hour=9, minute=45), day.replace(hour=10, minute=45))
+    # The 13:45:00 and 05:00:00 closing ticks join the last bar of their session
+    assert bar_start(day.replace(hour=13, minute=45), 60) == (day.replace(hour=12, minute=45), day.replace(hour=13, minute=45))
+    assert bar_start(day.replace(hour=13, minute=45), 1) == (day.replace(hour=13, minute=44), day.replace(hour=13, minute=45))
+    assert bar_start(day.replace(hour=5), 60) == (day.replace(hour=4), day.replace(hour=5))
+    # Night bars cross midnight without a gap
+    assert bar_start(day.replace(hour=23, minute=30), 60) == (day.replace(hour=23), day + timedelta(days=1))
+    assert bar_start(day + timedelta(days=1, minutes=10), 60) == (day + timedelta(days=1), day + timedelta(days=1, hours=1))
+    assert bar_start(day.replace(hour=14), 5) is None
+
+
+def test_ohlcv_and_bar_rollover():
+    agg = BarAggregator(intervals=(1, 5))
+    feed(agg, "TX00", DAY, 90000, 23000, 2)
+    feed(agg, "TX00", DAY, 90020, 23010, 1)
+    feed(agg, "TX00", DAY, 90040, 22990, 3)
+    feed(agg, "TX00", DAY, 90059, 23005, 1)
+    feed(agg, "TX00", DAY, 90100, 23020, 4)   # opens 09:01, closes the 09:00 bar
+
+    bars = closed(agg, "TX00", 1)
+    assert list(bars.index) == [datetime(2026, 10, 19, 9, 0)]
+    assert bars.iloc[0].tolist() == [23000.0, 23010.0, 22990.0, 23005.0, 7]
+    # The 5m bar is still open and includes both minutes
+    partial = agg.bars("TX00", 5)
+    assert partial.iloc[-1].tolist() == [23000.0, 23020.0, 22990.0, 23020.0, 11]
+    assert closed(agg, "TX00", 5).empty
+
+
+def test_night_session_across_midnight():
+    agg = BarAggregator(intervals=(60,))
+    feed(agg, "TX00", DAY, 235900, 23000)
+    feed(agg, "TX00", DAY + 1, 100, 23050)    # 00:01 next calendar day
+    feed(agg, "TX00", DAY + 1, 45959, 23100)
+    feed(agg, "TX00", DAY + 1, 50000, 23080)  # closing tick joins the 04:00 bar
+
+    bars = agg.bars("TX00", 60)
+    assert list(bars.index) == [datetime(2026, 10, 19, 23), datetime(2026, 10, 20, 0), datetime(2026, 10, 20, 4)]
+    assert bars.loc[datetime(2026, 10, 20, 4)].tolist() == [23100.0, 23100.0, 23080.0, 23080.0, 2]
+    assert agg.skipped == 0
+
+
+def test_day_close_tick_and_ticks_between_sessions():
+    agg = BarAggregator(intervals=(60,))
+    feed(agg, "TX00", DAY, 134459, 23000)
+    feed(agg, "TX00", DAY, 134500, 23010)     # 13:45:00 close
+    feed(agg, "TX00", DAY, 140000, 99999)     # between sessions: ignored
+    feed(agg, "TX00", DAY, 84459, 99999)      # before the open: ignored
+
+    bars = agg.bars("TX00", 60)
+    assert list(bars.index) == [datetime(2026, 10, 19, 12, 45)]
+    assert bars.iloc[0].tolist() == [23000.0, 23010.0, 23000.0, 23010.0, 2]
+    assert agg.skipped == 2
+    assert agg.ticks == 2
+
+
+def test_late_tick_for_closed_bar_is_ignored():
+    agg = BarAggregator(intervals=(1, 5))
+    feed(agg, "TX00", DAY, 90010, 23000)
+    feed(agg, "TX00", DAY, 90110, 23020)      # closes the 09:00 1m bar
+    feed(agg, "TX00", DAY, 90050, 30000)      # late for the closed 1m bar
+
+    assert closed(agg, "TX00", 1).iloc[0].tolist() == [23000.0, 23000.0, 23000.0, 23000.0, 1]
+    # ...but the 5m bar it belongs to is still open, so it counts there
+    assert agg.bars("TX00", 5).iloc[-1]["High"] == 30000.0
+
+    # Late again after the bar was closed by roll() with no current bar left
+    agg.roll(datetime(2026, 10, 19, 9, 10))
+    feed(agg, "TX00", DAY, 90130, 31000)
+    assert closed(agg, "TX00", 1)["High"].max() == 23020.0
+    assert agg.bars("TX00", 1).index[-1] == datetime(2026, 10, 19, 9, 1)
+
+
+def test_roll_on_idle_market_clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(bar_aggregator.time, "monotonic", lambda: clock[0])
+    agg = BarAggregator(intervals=(1, 5))
+    feed(agg, "TX00", DAY, 90030, 23000)
+
+    # Market clock = last tick time + idle time since it arrived
+    clock[0] += 20
+    assert agg.market_now() == datetime(2026, 10, 19, 9, 0, 50)
+    agg.roll()
+    assert closed(agg, "TX00", 1).empty
+
+    clock[0] += 15   # 09:01:05 with no new ticks: the 1m bar closes, the 5m bar does not
+    agg.roll()
+    assert len(closed(agg, "TX00", 1)) == 1
+    assert agg.bars("TX00", 1, include_partial=True).index[-1] == datetime(2026, 10, 19, 9, 0)
+    assert closed(agg, "TX00", 5).empty
+
+    clock[0] += 240  # 09:05:05
+    agg.roll()
+    assert len(closed(agg, "TX00", 5)) == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+# 79 bytes per tick: 2**18 slots is ~20 MB, enough for a busy TAIFEX session on a few
+# symbols before the oldest ticks are overwritten. Memory is allocated once up front.
+TICK_CAPACITY = int(os.getenv("CAPITAL_TICK_CAPACITY", str(2 ** 18)))
+
+TICK_DTYPE = np.dtype([
+    ("seq", "u8"),
+    ("symbol", "S16"),
+    ("market", "i2"),
+    ("simulate", "i1"),
+    ("date", "i4"),      # YYYYMMDD
+    ("time", "i4"),      # HHMMSS
+    ("micro", "i4"),
+    ("bid", "f8"),
+    ("ask", "f8"),
+    ("price", "f8"),
+    ("qty", "i8"),
+    ("recv_ts", "f8"),   # local time.time() when the callback fired
+])
+
+
+# The DLL hands symbols over as ANSI bytes on Windows; replays and tests pass str
+SYMBOL_CODEC = "ansi" if os.name == "nt" else "ascii"
+
+
+class SymbolTable:
+    """
+    Interns callback symbols: the first tick for a symbol decodes it once and caches both the
+    str name and the S16 bytes key the ring stores, so later ticks are a single dict lookup.
+    """
+    def __init__(self):
+        self._by_raw = {}
+
+    def intern(self, raw):
+        """raw bytes/str from the callback -> (name, key)."""
+        entry = self._by_raw.get(raw)
+        if entry is None:
+            name = raw.decode(SYMBOL_CODEC, "replace") if isinstance(raw, bytes) else raw
+            entry = self._by_raw[raw] = (sys.intern(name), name.encode("ascii", "replace")[:16])
+        return entry
+
+    def __len__(self):
+        return len(self._by_raw)
+
+
+class Quote:
+    """Latest quote for one symbol, as copied out of the QuoteTable (see quote_snapshot)."""
+    __slots__ = ("symbol", "seq", "date", "time", "bid", "ask", "price", "qty", "volume")
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.seq = -1
+        self.date = self.time = 0
+        self.bid = self.ask = self.price = 0
+        self.qty = self.volume = 0
+
+    def to_dict(self):
+        return {"symbol": self.symbol, "seq": self.seq, "date": self.date, "time": self.time,
+                "bid": self.bid, "ask": self.ask, "price": self.price, "qty": self.qty,
+                "vol": self.qty, "volume": self.volume}
+
+
+def tick_to_dict(row):
+    """One structured row -> the quote dict shape the rest of the code uses."""
+    return {
+        "seq": int(row["seq"]),
+        "symbol": row["symbol"].decode("ascii", "replace"),
+        "date": int(row["date"]),
+        "time": int(row["time"]),
+        "bid": float(row["bid"]),
+        "ask": float(row["ask"]),
+        "price": float(row["price"]),
+        "qty": int(row["qty"]),
+        "vol": int(row["qty"]),
+    }
+
+
+class TickRing:
+    """
+    Fixed-capacity tick ring over a preallocated structured numpy array.
+    Every tick gets a monotonically increasing sequence number; slot = seq % capacity.
+    The writer (DLL callback thread) never blocks on readers and never allocates: when the
+    ring is full the oldest tick is overwritten and counted. Readers keep their own cursor
+    and learn how many ticks they missed if they fall more than `capacity` behind.
+    """
+    def __init__(self, capacity=TICK_CAPACITY):
+        self.capacity = capacity
+        self.buf = np.zeros(capacity, dtype=TICK_DTYPE)
+        self.next_seq = 0          # sequence number the next tick will get
+        self.overwritten = 0       # ticks evicted before every reader necessarily saw them
+        self.reader_missed = 0     # ticks readers asked for after they were overwritten
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiting = 0          # readers blocked in wait(); append() skips notify when none
+
+    @property
+    def first_seq(self):
+        """Oldest sequence number still in the buffer."""
+        return max(0, self.next_seq - self.capacity)
+
+    def append(self, symbol, market, date, time_hms, micro, bid, ask, price, qty, simulate=0):
+        """`symbol` is ideally the interned bytes key from SymbolTable; str is encoded per call."""
+        with self._lock:
+            seq = self.next_seq
+            if seq >= self.capacity:
+                self.overwritten += 1
+            # One tuple store into the preallocated slot (field order = TICK_DTYPE)
+            self.buf[seq % self.capacity] = (
+                seq, symbol.encode("ascii", "replace") if isinstance(symbol, str) else symbol,
+                market, simulate, date, time_hms, micro, bid, ask, price, qty, time.time())
+            self.next_seq = seq + 1
+            if self._waiting:
+                self._cond.notify_all()
+        return seq
+
+    def read(self, cursor, max_items=None):
+        """
+        Ticks with seq >= cursor, oldest first, as a copied structured array.
+        Returns (rows, next_cursor, missed); `missed` counts ticks overwritten before this read.
+        """
+        with self._lock:
+            end = self.next_seq
+            start = max(cursor, end - self.capacity)
+            missed = start - cursor if cursor < start else 0
+            if max_items is not None:
+                end = min(end, start + max_items)
+            rows = self._slice(start, end)
+            if missed:
+                self.reader_missed += missed
+        return rows, max(end, start), missed
+
+    def wait(self, cursor, timeout=None, cancelled=None):
+        """
+        Block until a tick with seq >= cursor exists, `cancelled()` turns true (after a wake())
+        or the timeout passes. Returns True if such a tick exists.
+        """
+        with self._cond:
+            self._waiting += 1
+            try:
+                self._cond.wait_for(lambda: self.next_seq > cursor or (cancelled is not None and cancelled()), timeout)
+            finally:
+                self._waiting -= 1
+            return self.next_seq > cursor
+
+    def wake(self):
+        """Wake every reader blocked in wait() (used when a subscription is closed)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def latest(self, n=1):
+        with self._lock:
+            return self._slice(max(self.first_seq, self.next_seq - n), self.next_seq)
+
+    def _slice(self, start, end):
+        """Caller holds the lock. Copies [start, end) out of the ring, handling wrap-around."""
+        if end <= start:
+            return self.buf[:0].copy()
+        a, b = start % self.capacity, end % self.capacity
+        if a < b or b == 0:
+            return self.buf[a:b or self.capacity].copy()
+        return np.concatenate((self.buf[a:], self.buf[:b]))
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "next_seq": self.next_seq,
+            "buffered": self.next_seq - self.first_seq,
+            "overwritten": self.overwritten,
+            "reader_missed": self.reader_missed,
+            "bytes": self.buf.nbytes,
+        }
@@ -0,0 +1,119 @@
+import os
+import asyncio
+import logging
+import threading
+import itertools
+
+import numpy as np
+
+from tick_buffer import tick_to_dict
+
+logger = logging.getLogger("TickBus")
+
+# Upper bound on ticks copied per read, so a reader that fell far behind holds the ring
+# lock (and so delays the DLL callback thread) only for a bounded copy.
+TICK_READ_BATCH = int(os.getenv("CAPITAL_TICK_READ_BATCH", "4096"))
+
+
+class Subscription:
+    """
+    One consumer's view of the tick ring: its own cursor, an optional symbol filter and
+    counters. Consumers never remove ticks, so any number of them see the full stream;
+    a slow one only falls behind (and eventually misses overwritten ticks) on its own.
+    """
+    def __init__(self, bus, sub_id, symbols=None, cursor=0, name=None):
+        self.bus = bus
+        self.id = sub_id
+        self.name = name or f"sub-{sub_id}"
+        self.symbols = None
+        self.cursor = cursor
+        self.delivered = 0
+        self.missed = 0
+        self.closed = False
+        self.set_symbols(symbols)
+
+    def set_symbols(self, symbols):
+        if symbols is None:
+            self.symbols = None
+        else:
+            if isinstance(symbols, str):
+                symbols = symbols.split(",")
+            self.symbols = np.array([s.strip().encode("ascii") for s in symbols if s.strip()], dtype="S16")
+
+    def poll(self, timeout=None, max_items=TICK_READ_BATCH):
+        """
+        Next batch of matching ticks (structured rows), waiting up to `timeout` for new ones.
+        Returns an empty array on timeout or once closed.
+        """
+        ring = self.bus.ring
+        if self.closed:
+            return ring.buf[:0].copy()
+        if ring.next_seq <= self.cursor and not ring.wait(self.cursor, timeout, lambda: self.closed):
+            return ring.buf[:0].copy()
+        rows, self.cursor, missed = ring.read(self.cursor, max_items)
+        if missed:
+            self.missed += missed
+            logger.warning(f"{self.name} fell behind, {missed} ticks overwritten")
+        if self.symbols is not None and len(rows):
+            rows = rows[np.isin(rows["symbol"], self.symbols)]
+        self.delivered += len(rows)
+        return rows
+
+    async def apoll(self, timeout=1.0, max_items=TICK_READ_BATCH):
+        """poll() for asyncio consumers; the wait happens on a worker thread."""
+        return await asyncio.to_thread(self.poll, timeout, max_items)
+
+    def __iter__(self):
+        """Tick dicts until the subscription (or bus) is closed. Idle periods yield nothing."""
+        while not self.closed:
+            for row in self.poll(timeout=1.0):
+                yield tick_to_dict(row)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus._remove(self)
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "symbols": None if self.symbols is None else [s.decode("ascii") for s in self.symbols],
+            "cursor": self.cursor,
+            "lag": self.bus.ring.next_seq - self.cursor,
+            "delivered": self.delivered,
+            "missed": self.missed,
+        }
+
+
+class TickBus:
+    """Publish/subscribe over a TickRing: publishing is just the ring append; each subscriber pulls."""
+    def __init__(self, ring):
+        self.ring = ring
+        self._subs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbols=None, from_seq=None, name=None):
+        """`from_seq=None` starts at the next tick; pass ring.first_seq to replay what is buffered."""
+        cursor = self.ring.next_seq if from_seq is None else from_seq
+        with self._lock:
+            sub = Subscription(self, next(self._ids), symbols, cursor, name)
+            self._subs[sub.id] = sub
+        return sub
+
+    def _remove(self, sub):
+        with self._lock:
+            self._subs.pop(sub.id, None)
+        self.ring.wake()
+
+    def close(self):
+        for sub in self.subscriptions():
+            sub.close()
+
+    def subscriptions(self):
+        with self._lock:
+            return list(self._subs.values())
+
+    def stats(self):
+        return {"ring": self.ring.stats(), "subscribers": [s.stats() for s in self.subscriptions()]}
@@ -0,0 +1,140 @@
+import os
+import time
+import struct
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("TickReplay")
+
+# --- File format ---
+# 6-byte header (magic + version), then a stream of records:
+#   b"S" u16 id, u8 len, symbol bytes           -- symbol table entry, written once per symbol
+#   b"T" TICK_STRUCT                             -- one OnNotifyTicksLONG event (46 bytes total)
+# Prices/quantities are the raw integer values the DLL passes (scaled by 10^nDecimal).
+# nPtr is not kept by the tick ring, so recordings store 0 for it.
+MAGIC = b"PYTK"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+SYMBOL_STRUCT = struct.Struct("<HB")
+# offset seconds, symbol id, market, ptr, date, timeHMS, timeMicro, bid, ask, close, qty, simulate
+TICK_STRUCT = struct.Struct("<dHhiiiiiiiib")
+
+
+class TickRecorder:
+    """
+    Records every tick from a TickBus subscription to a compact binary file on its own
+    thread, so the DLL callback never waits on disk. `missed` counts ticks the ring
+    overwrote before the recorder read them (only under sustained overload).
+    """
+    def __init__(self, bus, path):
+        self.bus = bus
+        self.path = path
+        self.recorded = 0
+        self._symbols = {}
+        self._sub = None
+        self._thread = None
+        self._stop_seq = None
+
+    def start(self):
+        self._file = open(self.path, "wb", buffering=1024 * 1024)
+        self._file.write(HEADER.pack(MAGIC, VERSION))
+        self._origin = None
+        self._sub = self.bus.subscribe(name=f"recorder:{os.path.basename(self.path)}")
+        self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        write = self._file.write
+        while self._stop_seq is None or self._sub.cursor < self._stop_seq:
+            for row in self._sub.poll(timeout=0.2):
+                if self._origin is None:
+                    self._origin = float(row["recv_ts"])
+                sym_id = self._symbol_id(bytes(row["symbol"]))
+                write(b"T" + TICK_STRUCT.pack(
+                    float(row["recv_ts"]) - self._origin, sym_id, int(row["market"]), 0,
+                    int(row["date"]), int(row["time"]), int(row["micro"]), int(row["bid"]), int(row["ask"]),
+                    int(row["price"]), int(row["qty"]), int(row["simulate"])))
+                self.recorded += 1
+        self._sub.close()
+        self._file.close()
+
+    def _symbol_id(self, symbol):
+        sym_id = self._symbols.get(symbol)
+        if sym_id is None:
+            sym_id = self._symbols[symbol] = len(self._symbols)
+            self._file.write(b"S" + SYMBOL_STRUCT.pack(sym_id, len(symbol)) + symbol)
+        return sym_id
+
+    def stop(self, timeout=5.0):
+        """Stop once every tick published before this call is written; closes the file."""
+        if self._sub is not None and self._stop_seq is None:
+            self._stop_seq = self.bus.ring.next_seq
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {"path": self.path, "recorded": self.recorded, "missed": self._sub.missed if self._sub else 0}
+
+
+def read_ticks(path):
+    """Yields (offset_seconds, callback_args) for every tick in a recording."""
+    with open(path, "rb") as f:
+        magic, version = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a tick recording (v{VERSION})")
+        symbols = {}
+        while True:
+            kind = f.read(1)
+            if not kind:
+                return
+            if kind == b"S":
+                sym_id, length = SYMBOL_STRUCT.unpack(f.read(SYMBOL_STRUCT.size))
+                symbols[sym_id] = f.read(length).decode("ascii")
+            elif kind == b"T":
+                (offset, sym_id, market, ptr, date, time_hms, micro,
+                 bid, ask, close, qty, simulate) = TICK_STRUCT.unpack(f.read(TICK_STRUCT.size))
+                yield offset, (market, symbols[sym_id], ptr, date, time_hms, micro, bid, ask, close, qty, simulate)
+            else:
+                raise ValueError(f"Corrupt tick recording {path} at byte {f.tell() - 1}")
+
+
+def synthetic_ticks(symbols=("TX00",), count=100000, rate=1000.0, start=None, base_price=2300000, seed=0):
+    """
+    Random-walk ticks in the callback's argument order, `rate` per second of market time,
+    round-robin over `symbols`. Starts at the day-session open unless `start` is given.
+    """
+    rng = random.Random(seed)
+    start = start or datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(hours=8, minutes=45)
+    prices = {s: base_price for s in symbols}
+    step = 1.0 / rate
+    for i in range(count):
+        symbol = symbols[i % len(symbols)]
+        prices[symbol] += rng.randint(-3, 3) * 100
+        price = prices[symbol]
+        offset = i * step
+        ts = start + timedelta(seconds=offset)
+        yield offset, (2, symbol, i, ts.year * 10000 + ts.month * 100 + ts.day,
+                       ts.hour * 10000 + ts.minute * 100 + ts.second, ts.microsecond,
+                       price - 100, price + 100, price, rng.randint(1, 5), 0)
+
+
+def replay(ticks, callback, speed=1.0, stop=None):
+    """
+    Feeds (offset, args) ticks into `callback(*args)` (e.g. client._on_notify_ticks).
+    speed=1 keeps the recorded pacing, N plays N times faster, 0/None as fast as possible.
+    Returns (ticks_sent, elapsed_seconds).
+    """
+    sent = 0
+    t0 = time.perf_counter()
+    for offset, args in ticks:
+        if stop is not None and stop.is_set():
+            break
+        if speed:
+            delay = offset / speed - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+        callback(*args)
+        sent += 1
+    return sent, time.perf_counter() - t0
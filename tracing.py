@@ -0,0 +1,142 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger("Tracing")
+
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "5000"))  # per job; later spans are counted, not kept
+
+_current = contextvars.ContextVar("pystock_trace", default=None)
+
+
+def current():
+    return _current.get()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class Trace:
+    """
+    Timed spans for one job. Times are perf_counter offsets from the trace start.
+    The job runner activates the trace for its thread; code below it opens spans through the
+    module-level `span()`, which is a no-op outside a traced job (e.g. /api/check_stock).
+    Spans opened inside an event loop overlap each other, so they are flagged async.
+    """
+    def __init__(self, max_spans=TRACE_MAX_SPANS):
+        self.origin = time.perf_counter()
+        self.wall_start = time.time()
+        self.end = None   # perf_counter when the traced job finished; None while it runs
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def add(self, name, start, end, cat="scan", **args):
+        record = {
+            "name": name,
+            "cat": cat,
+            "start": start - self.origin,
+            "dur": end - start,
+            "thread": threading.current_thread().name,
+            "async": _in_event_loop(),
+            "args": args,
+        }
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(record)
+            else:
+                self.dropped += 1
+
+    def finish(self):
+        """Freeze elapsed time at the end of the job (later timeline reads report the same value)."""
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, cat="scan", **args):
+        """Yields the args dict so the body can attach results (e.g. rows downloaded)."""
+        t0 = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            self.add(name, t0, time.perf_counter(), cat, **args)
+
+    # --- Exports ---
+    def timeline(self, top=10):
+        """Spans in start order plus per-name totals and the slowest `top` of each name."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+            dropped = self.dropped
+        by_name = {}
+        for s in spans:
+            by_name.setdefault(s["name"], []).append(s)
+        summary = {}
+        for name, group in by_name.items():
+            durations = [s["dur"] for s in group]
+            slowest = sorted(group, key=lambda s: s["dur"], reverse=True)[:top]
+            summary[name] = {
+                "count": len(group),
+                "total_ms": round(sum(durations) * 1000, 1),
+                "max_ms": round(max(durations) * 1000, 1),
+                "slowest": [{"start_ms": round(s["start"] * 1000, 1), "duration_ms": round(s["dur"] * 1000, 1),
+                             **s["args"]} for s in slowest],
+            }
+        return {
+            "started_at": self.wall_start,
+            "elapsed_ms": round(((self.end or time.perf_counter()) - self.origin) * 1000, 1) if spans else 0.0,
+            "dropped_spans": dropped,
+            "summary": summary,
+            "spans": [{"name": s["name"], "cat": s["cat"], "start_ms": round(s["start"] * 1000, 3),
+                       "duration_ms": round(s["dur"] * 1000, 3), "thread": s["thread"], "args": s["args"]}
+                      for s in spans],
+        }
+
+    def chrome_events(self, pid=1):
+        """
+        Chrome trace event format (chrome://tracing, Perfetto, speedscope). Sequential spans are
+        complete ("X") events on their thread; overlapping async spans become b/e pairs.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for i, s in enumerate(spans):
+            ts = s["start"] * 1e6
+            if s["async"]:
+                base = {"name": s["name"], "cat": s["cat"], "pid": pid, "tid": s["thread"], "id": i}
+                events.append({**base, "ph": "b", "ts": ts, "args": s["args"]})
+                events.append({**base, "ph": "e", "ts": ts + s["dur"] * 1e6})
+            else:
+                events.append({"name": s["name"], "cat": s["cat"], "ph": "X", "ts": ts, "dur": s["dur"] * 1e6,
+                               "pid": pid, "tid": s["thread"], "args": s["args"]})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+@contextmanager
+def span(name, cat="scan", **args):
+    """Span on the active trace, if any."""
+    trace = _current.get()
+    if trace is None:
+        yield args
+        return
+    with trace.span(name, cat, **args) as a:
+        yield a